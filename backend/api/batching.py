@@ -0,0 +1,36 @@
+import threading
+from functools import partial
+
+from django.db import transaction
+
+
+class CommitBatch:
+    """
+    Собирает ключи за транзакцию и один раз после её фиксации
+    передаёт их множеством в handler.
+    Множество ключей привязано к списку run_on_commit соединения:
+    Django заменяет этот список при фиксации и откате транзакции,
+    поэтому ключи отменённой транзакции отбрасываются вместе с её
+    обработчиками и не попадают в следующую пачку.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.local = threading.local()
+
+    def add(self, keys):
+        run_on_commit = transaction.get_connection().run_on_commit
+        if getattr(self.local, "run_on_commit", None) is not run_on_commit:
+            self.local.run_on_commit = run_on_commit
+            self.local.pending = set()
+        pending = self.local.pending
+        pending.update(keys)
+        # Первый из вызовов flush после фиксации заберёт все ключи,
+        # остальные найдут пустое множество.
+        transaction.on_commit(partial(self.flush, pending))
+
+    def flush(self, pending):
+        keys = set(pending)
+        pending.clear()
+        if keys:
+            self.handler(keys)
@@ -0,0 +1,272 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from foodgram.metrics import cache_result
+
+# Значение, которым get_or_set запоминает отсутствие данных.
+NEGATIVE = "api.cache:negative"
+
+# Как и в LocMemCache, состояние общее для всех потоков процесса:
+# django.core.cache.caches создаёт свой экземпляр бэкенда в каждом потоке.
+_locals = {}
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+class LocalLRU:
+    """
+    Ограниченный кэш в памяти процесса. Значения хранятся
+    сериализованными, их размер учитывается: при превышении max_entries
+    записей или max_bytes байт вытесняются давно не читанные записи.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, data = entry
+            if expires <= time.monotonic():
+                self.pop(key)
+                return None
+            self.entries.move_to_end(key)
+            return data
+
+    def set(self, key, data, ttl):
+        with self.lock:
+            self.pop(key)
+            if ttl <= 0 or len(data) > self.max_bytes:
+                return
+            self.entries[key] = (time.monotonic() + ttl, data)
+            self.size += len(data)
+            while (len(self.entries) > self.max_entries
+                   or self.size > self.max_bytes):
+                self.pop(next(iter(self.entries)))
+
+    def delete(self, key):
+        with self.lock:
+            return self.pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size -= len(entry[1])
+        return True
+
+
+@contextmanager
+def single_flight(key):
+    """
+    Пропускает к ключу key по одному потоку процесса.
+    """
+
+    with _flights_lock:
+        lock, waiting = _flights.get(key, (None, 0))
+        _flights[key] = (lock or threading.Lock(), waiting + 1)
+        lock = _flights[key][0]
+    try:
+        with lock:
+            yield
+    finally:
+        with _flights_lock:
+            waiting = _flights[key][1] - 1
+            if waiting:
+                _flights[key] = (lock, waiting)
+            else:
+                del _flights[key]
+
+
+class TieredCache(BaseCache):
+    """
+    Двухуровневый кэш: ограниченный LRU в памяти процесса перед общим
+    кэшем OPTIONS["SHARED"]. Записи живут в памяти процесса не дольше
+    LOCAL_TIMEOUT секунд, поэтому изменение или удаление в другом
+    процессе становится видно не позже чем через это время.
+    get_or_set вычисляет значение один раз на процесс: потоки процесса
+    ждут на общей блокировке. Между процессами вычисление разделяется
+    по возможности: ключ-блокировка ставится через add общего кэша,
+    а add в FileBasedCache не атомарен, поэтому изредка значение
+    вычислят несколько процессов сразу. Вычисление должно быть
+    безопасно повторять. Отсутствие данных (None) тоже запоминается,
+    на NEGATIVE_TIMEOUT секунд. Попадания и промахи каждого уровня
+    учитываются в метрике cache_requests_total.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.name = name
+        self.shared_alias = options.get("SHARED", "default")
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        self.negative_timeout = options.get("NEGATIVE_TIMEOUT", 30)
+        self.lock_timeout = options.get("LOCK_TIMEOUT", 10)
+        self.local = _locals.setdefault(name, LocalLRU(
+            self._max_entries, options.get("MAX_BYTES", 16 * 1024 * 1024)))
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def resolve_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def local_key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def set_local(self, local_key, value, timeout):
+        ttl = self.local_timeout
+        if timeout is not None:
+            ttl = min(ttl, timeout)
+        self.local.set(local_key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                       ttl)
+
+    def get_many_tiered(self, keys, version):
+        """
+        Значения ключей keys, включая отметки NEGATIVE:
+        сначала из памяти процесса, недостающие — из общего кэша.
+        """
+
+        found, missing = {}, {}
+        for key in keys:
+            local_key = self.local_key(key, version)
+            data = self.local.get(local_key)
+            if data is None:
+                missing[key] = local_key
+            else:
+                found[key] = pickle.loads(data)
+        cache_result(f"{self.name}_local", len(found), len(missing))
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            cache_result(f"{self.name}_shared",
+                         len(shared), len(missing) - len(shared))
+            for key, value in shared.items():
+                self.set_local(missing[key], value, None)
+            found.update(shared)
+        return found
+
+    def get(self, key, default=None, version=None):
+        value = self.get_many_tiered([key], version).get(key)
+        return default if value is None or value == NEGATIVE else value
+
+    def get_many(self, keys, version=None):
+        return {
+            key: value
+            for key, value in self.get_many_tiered(keys, version).items()
+            if value != NEGATIVE
+        }
+
+    def has_key(self, key, version=None):
+        return self.get(key, version=version) is not None
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.resolve_timeout(timeout)
+        self.shared.set(key, value, timeout, version=version)
+        self.set_local(self.local_key(key, version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.resolve_timeout(timeout)
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self.set_local(self.local_key(key, version), value, timeout)
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.resolve_timeout(timeout)
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self.set_local(self.local_key(key, version), value, timeout)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(
+            key, self.resolve_timeout(timeout), version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(self.local_key(key, version))
+        return self.shared.incr(key, delta, version=version)
+
+    def delete(self, key, version=None):
+        self.local.delete(self.local_key(key, version))
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.local.delete(self.local_key(key, version))
+        self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        value = self.get_many_tiered([key], version).get(key)
+        if value is None:
+            value = self.fill(key, default, timeout, version)
+        return None if value == NEGATIVE else value
+
+    def fill(self, key, default, timeout, version):
+        """
+        Вычисляет значение ключа, если его ещё не вычислил другой поток
+        или процесс, и сохраняет его на обоих уровнях.
+        """
+
+        local_key = self.local_key(key, version)
+        lock_key = f"{key}:lock"
+        with single_flight(local_key):
+            data = self.local.get(local_key)
+            if data is not None:
+                return pickle.loads(data)
+            # Блокировка между процессами — по возможности, см. выше.
+            locked = self.shared.add(
+                lock_key, 1, self.lock_timeout, version=version)
+            if not locked:
+                value = self.wait(key, version)
+                if value is not None:
+                    self.set_local(local_key, value, None)
+                    return value
+            try:
+                value = default() if callable(default) else default
+                if value is None:
+                    self.set(key, NEGATIVE, self.negative_timeout, version)
+                    return NEGATIVE
+                self.set(key, value, timeout, version)
+                return value
+            finally:
+                if locked:
+                    self.shared.delete(lock_key, version=version)
+
+    def wait(self, key, version):
+        """
+        Ждёт, пока значение ключа вычислит другой процесс, но не дольше
+        LOCK_TIMEOUT секунд.
+        """
+
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            value = self.shared.get(key, version=version)
+            if value is not None:
+                return value
+            time.sleep(0.05)
+        return None
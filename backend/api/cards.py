@@ -0,0 +1,78 @@
+from django.db import connection, transaction
+
+from recipes.models import Recipe, RecipeCard
+from .batching import CommitBatch
+from .fast_serializers import recipe_fragment
+
+CHUNK_SIZE = 500
+
+
+def build_cards(recipe_ids):
+    recipes = (
+        Recipe.objects.filter(pk__in=recipe_ids)
+        .select_related("author")
+        .prefetch_related("tags", "ingredient_in_recipe__ingredient")
+    )
+    return [
+        RecipeCard(
+            recipe=recipe,
+            author_id=recipe.author_id,
+            pub_date=recipe.pub_date,
+            tag_ids=sorted(tag.id for tag in recipe.tags.all()),
+            data=recipe_fragment(recipe),
+        )
+        for recipe in recipes
+    ]
+
+
+def upsert_cards(cards):
+    """
+    Записывает карточки одним запросом INSERT ... ON CONFLICT DO UPDATE:
+    параллельные перестройки одной карточки не конфликтуют
+    по первичному ключу, последняя запись побеждает.
+    """
+
+    if not cards:
+        return
+    fields = RecipeCard._meta.concrete_fields
+    quote = connection.ops.quote_name
+    sql = "INSERT INTO {} ({}) VALUES {} ON CONFLICT ({}) DO UPDATE SET {}"
+    sql = sql.format(
+        quote(RecipeCard._meta.db_table),
+        ", ".join(quote(field.column) for field in fields),
+        ", ".join(
+            ["({})".format(", ".join(["%s"] * len(fields)))] * len(cards)),
+        quote(RecipeCard._meta.pk.column),
+        ", ".join(
+            "{0} = EXCLUDED.{0}".format(quote(field.column))
+            for field in fields if not field.primary_key),
+    )
+    params = [
+        field.get_db_prep_save(field.pre_save(card, True), connection)
+        for card in cards
+        for field in fields
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def refresh_cards(recipe_ids):
+    """
+    Перестраивает карточки рецептов по текущим данным БД.
+    Карточки удалённых рецептов удаляются.
+    """
+
+    recipe_ids = list(recipe_ids)
+    for start in range(0, len(recipe_ids), CHUNK_SIZE):
+        chunk = recipe_ids[start:start + CHUNK_SIZE]
+        cards = build_cards(chunk)
+        with transaction.atomic():
+            upsert_cards(cards)
+            RecipeCard.objects.filter(pk__in=chunk).exclude(
+                pk__in=[card.recipe_id for card in cards]).delete()
+
+
+# Запись рецепта шлёт сигналы для самого рецепта, каждой строки
+# ингредиентов и тегов: карточка перестраивается один раз после
+# фиксации транзакции.
+dirty_cards = CommitBatch(refresh_cards)
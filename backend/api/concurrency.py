@@ -0,0 +1,48 @@
+import hashlib
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .renderers import FastJSONRenderer
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "Рецепт изменён с момента загрузки, обновите его."
+    default_code = "precondition_failed"
+
+
+class Conflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Рецепт одновременно изменён другим запросом."
+    default_code = "conflict"
+
+
+def recipe_etag(version, data, user):
+    """
+    ETag представления рецепта: версия рецепта для If-Match и хеш
+    отданного тела вместе с пользователем. В теле есть флаги
+    пользователя и связанные списки, которые меняются без смены
+    версии, поэтому одной версии для ETag недостаточно.
+    """
+
+    digest = hashlib.sha256(
+        f"{user.pk}:".encode() + FastJSONRenderer().render(data)
+    ).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+def if_match_version(request):
+    """
+    Версия рецепта из заголовка If-Match или None, если заголовка нет.
+    Слабый ETag принимается: его выставляет сжатие ответа.
+    """
+
+    header = request.headers.get("If-Match")
+    if not header or header.strip() == "*":
+        return None
+    etag = header.strip().removeprefix("W/").strip('"')
+    try:
+        return int(etag.partition("-")[0])
+    except ValueError:
+        raise PreconditionFailed
@@ -0,0 +1,97 @@
+from recipes.models import Recipe
+
+
+def image_url(value):
+    """
+    Ссылка на изображение, как её отдаёт ImageField без request.
+    """
+
+    if not value:
+        return None
+    return Recipe._meta.get_field("image").storage.url(str(value))
+
+
+class FastSerializer:
+    """
+    Сериализатор только для чтения без накладных расходов DRF.
+    Принимает строки .values() или загруженные объекты
+    и отдаёт те же словари, что и соответствующий ModelSerializer.
+    """
+
+    __slots__ = ("fields", "converters")
+
+    def __init__(self, *fields, **converters):
+        self.fields = fields
+        self.converters = converters
+
+    def to_representation(self, instance):
+        if isinstance(instance, dict):
+            data = {field: instance[field] for field in self.fields}
+        else:
+            data = {field: getattr(instance, field) for field in self.fields}
+        for field, convert in self.converters.items():
+            data[field] = convert(data[field])
+        return data
+
+    def many(self, instances):
+        return [self.to_representation(instance) for instance in instances]
+
+
+# Аналог TagSerializer.
+TAG = FastSerializer("id", "name", "color", "slug")
+# Аналог IngredientSerializer.
+INGREDIENT = FastSerializer("id", "name", "measurement_unit")
+# Аналог RecipePartSerializer.
+RECIPE_PART = FastSerializer(
+    "id", "name", "image", "cooking_time", image=image_url)
+# Аналог RecipeAuthorSerializer.
+RECIPE_AUTHOR = FastSerializer(
+    "email", "id", "username", "first_name", "last_name")
+# Аналог IngredientAmountSerializer для словарей.
+RECIPE_INGREDIENT = FastSerializer(
+    "id", "name", "measurement_unit", "amount")
+
+
+def recipe_fragment(recipe):
+    """
+    Аналог RecipeGetSerializer для рецепта с подгруженными
+    автором, тегами и ингредиентами.
+    """
+
+    return {
+        "id": recipe.id,
+        "tags": TAG.many(recipe.tags.all()),
+        "name": recipe.name,
+        "author": RECIPE_AUTHOR.to_representation(recipe.author),
+        "ingredients": [
+            {
+                "id": amount.ingredient.id,
+                "name": amount.ingredient.name,
+                "measurement_unit": amount.ingredient.measurement_unit,
+                "amount": amount.amount,
+            }
+            for amount in recipe.ingredient_in_recipe.all()
+        ],
+        "image": image_url(recipe.image),
+        "text": recipe.text,
+        "cooking_time": recipe.cooking_time,
+    }
+
+
+def stored_fragment(data):
+    """
+    Восстанавливает порядок ключей recipe_fragment во фрагменте,
+    прочитанном из jsonb: PostgreSQL хранит ключи объекта
+    в собственном порядке.
+    """
+
+    return {
+        "id": data["id"],
+        "tags": TAG.many(data["tags"]),
+        "name": data["name"],
+        "author": RECIPE_AUTHOR.to_representation(data["author"]),
+        "ingredients": RECIPE_INGREDIENT.many(data["ingredients"]),
+        "image": data["image"],
+        "text": data["text"],
+        "cooking_time": data["cooking_time"],
+    }
@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow, User
+
+FEED_PULL_KEY = "feed-pulled:{}"
+
+
+def feed_entries(user_id, recipes):
+    return [
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe.id,
+            author_id=recipe.author_id,
+            pub_date=recipe.pub_date,
+        )
+        for recipe in recipes
+    ]
+
+
+def fan_out_recipe(recipe):
+    """
+    Раскладывает новый рецепт по лентам подписчиков автора.
+    Рецепты авторов с огромным числом подписчиков не раскладываются:
+    подписчики забирают их сами при чтении ленты.
+    """
+
+    if User.objects.filter(
+        pk=recipe.author_id, follower_count__gt=settings.FEED_FANOUT_LIMIT
+    ).exists():
+        return
+    followers = Follow.objects.filter(author_id=recipe.author_id)
+    batch = []
+    for user_id in followers.values_list("user_id", flat=True).iterator():
+        batch.extend(feed_entries(user_id, [recipe]))
+        if len(batch) >= settings.FEED_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill_follow(user_id, author_id):
+    """
+    Добавляет в ленту последние рецепты автора после подписки.
+    Задача выполняется позже подписки, поэтому подписка проверяется
+    и блокируется до конца транзакции: если пользователь уже отписался,
+    лента не меняется, а отписка во время заполнения ждёт его
+    завершения и затем убирает добавленные рецепты.
+    """
+
+    with transaction.atomic():
+        follow = Follow.objects.select_for_update().filter(
+            user_id=user_id, author_id=author_id).first()
+        if follow is None:
+            return
+        recipes = Recipe.objects.filter(author_id=author_id).only(
+            "id", "author_id", "pub_date")[:settings.FEED_BACKFILL_SIZE]
+        FeedEntry.objects.bulk_create(
+            feed_entries(user_id, recipes), ignore_conflicts=True)
+
+
+def count_follower(author_id, delta):
+    """
+    Меняет счётчик подписчиков автора одним запросом UPDATE.
+    """
+
+    User.objects.filter(pk=author_id).update(
+        follower_count=F("follower_count") + delta)
+
+
+def trim_follow(user_id, author_id):
+    """
+    Убирает из ленты рецепты автора после отписки.
+    """
+
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def pull_heavy_authors(user):
+    """
+    Забирает в ленту свежие рецепты авторов, для которых
+    раскладка при записи не выполняется. Выполняется не чаще
+    одного раза в FEED_PULL_INTERVAL секунд на пользователя.
+    """
+
+    if not cache.add(
+        FEED_PULL_KEY.format(user.id), True, settings.FEED_PULL_INTERVAL
+    ):
+        return
+    heavy_authors = Follow.objects.filter(
+        user=user, author__follower_count__gt=settings.FEED_FANOUT_LIMIT,
+    ).values("author_id")
+    recipes = Recipe.objects.filter(author_id__in=heavy_authors).only(
+        "id", "author_id", "pub_date")[:settings.FEED_BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create(
+        feed_entries(user.id, recipes), ignore_conflicts=True)
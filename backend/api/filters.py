@@ -1,19 +1,45 @@
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Collate, Lower
 from django_filters import rest_framework as filters
 from rest_framework.exceptions import AuthenticationFailed
 
-from recipes.models import Recipe, Tag
+from recipes.models import Cart, Favorite, Recipe, RecipeCard
 from django.contrib.auth import get_user_model
+from .tag_snapshot import get_tag_snapshot
 
 User = get_user_model()
 
+TAGS_MODE_ANY = "any"
+TAGS_MODE_ALL = "all"
+
+
+def tag_choices():
+    return [(slug, slug) for slug in get_tag_snapshot().by_slug]
+
 
 class RecipeFilter(filters.FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
+    """
+    Фильтр рецептов.
+    Каждое условие строится как коррелированный подзапрос EXISTS,
+    поэтому выборка не размножает строки и не требует DISTINCT.
+    Слаги тегов проверяются и переводятся в id по снимку тегов
+    в памяти, без запроса к таблице тегов.
+    """
+
+    tags = filters.MultipleChoiceFilter(
         field_name="tags__slug",
-        to_field_name="slug",
-        queryset=Tag.objects.all(),
+        choices=tag_choices,
+        method="filter_tags",
         label="Выберите один тег или несколько тегов",
     )
+    tags_mode = filters.ChoiceFilter(
+        choices=(
+            (TAGS_MODE_ANY, "Любой из тегов"),
+            (TAGS_MODE_ALL, "Все теги"),
+        ),
+        method="filter_tags_mode",
+        label="Режим отбора по тегам",
+    )
     is_favorited = filters.BooleanFilter(
         method="filter_is_favorited",
         label="В Избранном",
@@ -27,23 +53,90 @@ class RecipeFilter(filters.FilterSet):
         model = Recipe
         fields = ("author", "tags", "is_favorited", "is_in_shopping_cart")
 
-    def filter_is_favorited(self, queryset, name, value):
+    def filter_related_exists(self, queryset, model, value):
         if self.request.user.is_anonymous:
             raise AuthenticationFailed({"errors": "Вам нужно авторизоваться!"})
         if value:
             return queryset.filter(
-                in_favorite__recipe_subscriber=self.request.user)
+                Exists(model.objects.filter(
+                    user=self.request.user, recipe=OuterRef("pk")))
+            )
         return queryset
 
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_related_exists(queryset, Favorite, value)
+
     def filter_is_in_shopping_cart(self, queryset, name, value):
-        if self.request.user.is_anonymous:
-            raise AuthenticationFailed({"errors": "Вам нужно авторизоваться!"})
-        if value:
-            return queryset.filter(shopping_cart__cart_owner=self.request.user)
-        return queryset
+        return self.filter_related_exists(queryset, Cart, value)
 
     def filter_author(self, queryset, name, value):
         return queryset.filter(author=value)
 
+    def get_tag_ids(self, slugs):
+        by_slug = get_tag_snapshot().by_slug
+        return [by_slug[slug] for slug in slugs if slug in by_slug]
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        tag_ids = self.get_tag_ids(value)
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe=OuterRef("pk"))
+        if self.form.cleaned_data.get("tags_mode") == TAGS_MODE_ALL:
+            for tag_id in tag_ids:
+                queryset = queryset.filter(
+                    Exists(recipe_tags.filter(tag_id=tag_id)))
+            return queryset
+        return queryset.filter(Exists(recipe_tags.filter(tag_id__in=tag_ids)))
+
+    def filter_tags_mode(self, queryset, name, value):
+        return queryset
+
+
+class RecipeCardFilter(RecipeFilter):
+    """
+    Фильтр карточек рецептов с теми же параметрами, что RecipeFilter.
+    Первичный ключ карточки совпадает с id рецепта, поэтому условия
+    по избранному и корзине переиспользуются как есть, а теги
+    проверяются по массиву tag_ids карточки через GIN-индекс.
+    """
+
+    class Meta:
+        model = RecipeCard
+        fields = RecipeFilter.Meta.fields
+
     def filter_tags(self, queryset, name, value):
-        return queryset.filter(tags__in=value)
+        if not value:
+            return queryset
+        tag_ids = self.get_tag_ids(value)
+        if self.form.cleaned_data.get("tags_mode") == TAGS_MODE_ALL:
+            return queryset.filter(tag_ids__contains=tag_ids)
+        return queryset.filter(tag_ids__overlap=tag_ids)
+
+
+class UserFilter(filters.FilterSet):
+    """
+    Фильтр пользователей.
+    search отбирает пользователей по началу username или email
+    без учёта регистра; выражения совпадают с функциональными
+    индексами модели User.
+    """
+
+    search = filters.CharFilter(
+        method="filter_search",
+        label="Начало имени пользователя или email",
+    )
+
+    class Meta:
+        model = User
+        fields = ()
+
+    def filter_search(self, queryset, name, value):
+        prefix = value.lower()
+        return queryset.alias(
+            username_key=Collate(Lower("username"), "C"),
+            email_key=Collate(Lower("email"), "C"),
+        ).filter(
+            Q(username_key__startswith=prefix)
+            | Q(email_key__startswith=prefix)
+        )
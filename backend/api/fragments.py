@@ -0,0 +1,80 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from foodgram.metrics import cache_result
+
+FRAGMENT_KEY_PREFIX = "recipe-fragment"
+GENERATION_KEY = "recipe-fragment:generation"
+
+
+def get_cache():
+    return caches[settings.RECIPE_FRAGMENT_CACHE]
+
+
+def get_generation():
+    """
+    Текущее поколение фрагментов.
+    Смена поколения разом делает недействительными все фрагменты.
+    """
+
+    return get_cache().get_or_set(GENERATION_KEY, time.time_ns(), None)
+
+
+def fragment_key(recipe_id, generation):
+    return f"{FRAGMENT_KEY_PREFIX}:{generation}:{recipe_id}"
+
+
+def get_fragments(recipe_ids, render):
+    """
+    Возвращает словарь {id рецепта: фрагмент}.
+    Фрагменты читаются из кэша одним get_many, недостающие
+    отрисовываются функцией render(ids) и сохраняются в кэш.
+    """
+
+    cache = get_cache()
+    generation = get_generation()
+    keys = {fragment_key(pk, generation): pk for pk in recipe_ids}
+    fragments = {
+        keys[key]: fragment
+        for key, fragment in cache.get_many(keys).items()
+    }
+    missing = [pk for pk in recipe_ids if pk not in fragments]
+    cache_result("recipe_fragments", len(fragments), len(missing))
+    if missing:
+        rendered = render(missing)
+        cache.set_many(
+            {fragment_key(pk, generation): data
+             for pk, data in rendered.items()},
+            settings.RECIPE_FRAGMENT_TIMEOUT,
+        )
+        fragments.update(rendered)
+    return fragments
+
+
+def invalidate_fragments(recipe_ids):
+    """
+    Удаляет фрагменты рецептов после фиксации текущей транзакции.
+    """
+
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+
+    def delete():
+        generation = get_generation()
+        get_cache().delete_many(
+            [fragment_key(pk, generation) for pk in recipe_ids])
+
+    transaction.on_commit(delete)
+
+
+def invalidate_all_fragments():
+    """
+    Начинает новое поколение фрагментов после фиксации транзакции.
+    """
+
+    transaction.on_commit(
+        lambda: get_cache().set(GENERATION_KEY, time.time_ns(), None))
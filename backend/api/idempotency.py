@@ -0,0 +1,120 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+class RequestInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Запрос с этим Idempotency-Key ещё выполняется."
+    default_code = "request_in_progress"
+
+
+class KeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "Idempotency-Key уже использован для другого запроса."
+    default_code = "idempotency_key_reused"
+
+
+def request_fingerprint(request):
+    return hashlib.sha256(json.dumps(
+        [request.method, request.get_full_path(), request.data],
+        sort_keys=True, default=str,
+    ).encode()).hexdigest()
+
+
+def prune_idempotency_keys():
+    """
+    Удаляет ключи старше IDEMPOTENCY_TTL и возвращает их число.
+    """
+
+    deleted, _ = IdempotencyKey.objects.filter(
+        created__lt=timezone.now() - timedelta(
+            seconds=settings.IDEMPOTENCY_TTL)).delete()
+    return deleted
+
+
+def claim_key(user, key, fingerprint):
+    """
+    Занимает ключ для выполнения запроса. Возвращает None, если ключ
+    занят этим запросом, или уже существующую запись ключа. Ключ,
+    который держит слишком долго выполняющийся запрос, или устаревший
+    ключ занимается заново условным UPDATE.
+    """
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(
+                user=user, key=key, fingerprint=fingerprint, created=now)
+        return None
+    except IntegrityError:
+        pass
+    abandoned = Q(status_code__isnull=True, created__lt=now - timedelta(
+        seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT))
+    expired = Q(created__lt=now - timedelta(
+        seconds=settings.IDEMPOTENCY_TTL))
+    if IdempotencyKey.objects.filter(
+        abandoned | expired, user=user, key=key
+    ).update(fingerprint=fingerprint, status_code=None, data=None,
+             etag="", created=now):
+        return None
+    return IdempotencyKey.objects.filter(user=user, key=key).first()
+
+
+def idempotent(view_method):
+    """
+    Обрабатывает заголовок Idempotency-Key у POST-запросов: ответ
+    на первый запрос хранится IDEMPOTENCY_TTL секунд, а повтор с тем же
+    ключом получает его вместе с ETag без повторного выполнения.
+    Ключи хранятся в таблице IdempotencyKey раздельно для каждого
+    пользователя; одновременные запросы с одним ключом различает
+    ограничение уникальности.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if (request.method != "POST" or not key
+                or not request.user.is_authenticated):
+            return view_method(self, request, *args, **kwargs)
+        key = hashlib.sha256(key.encode()).hexdigest()
+        fingerprint = request_fingerprint(request)
+        stored = claim_key(request.user, key, fingerprint)
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                raise KeyReused
+            if stored.status_code is None:
+                raise RequestInProgress
+            response = Response(stored.data, status=stored.status_code)
+            if stored.etag:
+                response["ETag"] = stored.etag
+            response["Idempotent-Replayed"] = "true"
+            return response
+        claimed = IdempotencyKey.objects.filter(
+            user=request.user, key=key, fingerprint=fingerprint,
+            status_code__isnull=True)
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            claimed.delete()
+            raise
+        if response.status_code >= 500:
+            claimed.delete()
+        else:
+            claimed.update(status_code=response.status_code,
+                           data=response.data,
+                           etag=response.get("ETag", ""))
+        return response
+
+    return wrapper
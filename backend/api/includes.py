@@ -0,0 +1,79 @@
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+from foodgram.metrics import timed
+from recipes.models import RecipeCard, SimilarRecipe
+from .fragments import get_fragments
+from .serializers import render_recipe_fragments, with_user_flags
+
+
+def author_recipes(recipe, limit):
+    """
+    Последние рецепты автора, кроме самого рецепта.
+    """
+
+    return list(
+        RecipeCard.objects.filter(author_id=recipe.author_id)
+        .exclude(recipe_id=recipe.id)
+        .order_by("-pub_date")
+        .values_list("data", flat=True)[:limit]
+    )
+
+
+def similar_recipes(recipe, limit):
+    """
+    Самые похожие рецепты в порядке убывания сходства.
+    """
+
+    return list(
+        SimilarRecipe.objects.filter(
+            recipe_id=recipe.id, similar__card__isnull=False)
+        .order_by("-score")
+        .values_list("similar__card__data", flat=True)[:limit]
+    )
+
+
+INCLUDES = {
+    "author_recipes": author_recipes,
+    "similar": similar_recipes,
+}
+
+
+def parse_includes(request):
+    """
+    Имена связанных списков из параметра include=a,b.
+    """
+
+    value = request.query_params.get("include", "")
+    names = list(dict.fromkeys(
+        name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in names if name not in INCLUDES]
+    if unknown:
+        raise ValidationError({"include": [
+            "Неизвестные значения: {}. Допустимые: {}.".format(
+                ", ".join(unknown), ", ".join(INCLUDES))]})
+    return names
+
+
+def represent_recipe_with_includes(recipe, names, request):
+    """
+    Представление рецепта вместе со связанными списками рецептов.
+    Каждый список читается из карточек одним ограниченным запросом,
+    а флаги пользователя вычисляются сразу для всех рецептов ответа,
+    поэтому число запросов не зависит от размера списков.
+    """
+
+    with timed("serialization_duration_seconds", serializer="recipe_bundle"):
+        fragment = get_fragments(
+            [recipe.id], render_recipe_fragments)[recipe.id]
+        groups = [
+            INCLUDES[name](recipe, settings.RECIPE_INCLUDE_LIMIT)
+            for name in names
+        ]
+        flagged = iter(with_user_flags(
+            [fragment] + [item for group in groups for item in group],
+            request))
+        data = next(flagged)
+        for name, group in zip(names, groups):
+            data[name] = [next(flagged) for _ in group]
+        return data
@@ -0,0 +1,36 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+GENERATION_KEY = "ingredients:generation"
+
+
+def get_cache():
+    return caches[settings.INGREDIENT_CACHE]
+
+
+def cached_ingredients(kind, value, compute):
+    """
+    Результат compute() для запроса вида kind со значением value,
+    закэшированный в текущем поколении справочника ингредиентов.
+    Результат None тоже кэшируется, так что повторные запросы
+    несуществующего ингредиента не доходят до БД.
+    """
+
+    cache = get_cache()
+    generation = cache.get_or_set(GENERATION_KEY, time.time_ns, None)
+    key = "ingredients:{}:{}:{}".format(
+        generation, kind, hashlib.md5(value.encode()).hexdigest())
+    return cache.get_or_set(key, compute, settings.INGREDIENT_CACHE_TIMEOUT)
+
+
+def invalidate_ingredients():
+    """
+    Начинает новое поколение справочника после фиксации транзакции.
+    """
+
+    transaction.on_commit(
+        lambda: get_cache().set(GENERATION_KEY, time.time_ns(), None))
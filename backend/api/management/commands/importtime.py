@@ -0,0 +1,103 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+STARTUP = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns; "
+    "import {wsgi}; "
+    "import json, sys; print(json.dumps(sorted(sys.modules)))"
+)
+
+
+def parse_importtime(output):
+    """
+    Разбирает вывод python -X importtime: возвращает список
+    (модуль, собственное время, накопленное время, уровень вложенности),
+    время в микросекундах.
+    """
+
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(own), int(cumulative), depth))
+    return modules
+
+
+class Command(BaseCommand):
+    """
+    Команда отчёта о времени импорта приложения.
+    В отдельном процессе с python -X importtime выполняет то же, что
+    воркер gunicorn при загрузке: django.setup(), URLconf и WSGI-модуль.
+    Печатает пакеты с наибольшим собственным временем импорта и
+    завершается ошибкой, если после загрузки в sys.modules есть пакет
+    из LAZY_IMPORTS. Время импорта заметно колеблется от запуска
+    к запуску, поэтому бюджет проверяется, только если задан --budget.
+    """
+
+    help = "Отчёт о времени импорта приложения при запуске."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top", type=int, default=20,
+            help="Сколько самых медленных пакетов показать.")
+        parser.add_argument(
+            "--budget", type=int,
+            help="Бюджет суммарного времени импорта в миллисекундах.")
+
+    def handle(self, *args, **options):
+        wsgi = settings.WSGI_APPLICATION.rsplit(".", 1)[0]
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c",
+             STARTUP.format(wsgi=wsgi)],
+            cwd=settings.BASE_DIR,
+            env=os.environ.copy(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        modules = parse_importtime(result.stderr)
+        if result.returncode:
+            raise CommandError(
+                "Не удалось загрузить приложение:\n" + "\n".join(
+                    line for line in result.stderr.splitlines()
+                    if not line.startswith("import time:")))
+
+        packages = defaultdict(int)
+        for name, own, cumulative, depth in modules:
+            packages[name.split(".")[0]] += own
+        total = sum(
+            cumulative for name, own, cumulative, depth in modules
+            if depth == 0) / 1000
+        for package, own in sorted(
+            packages.items(), key=lambda item: item[1], reverse=True
+        )[:options["top"]]:
+            self.stdout.write(f"{own / 1000:9.1f} ms  {package}")
+        self.stdout.write(
+            f"Всего: {total:.1f} ms, модулей: {len(modules)}")
+
+        loaded = {name.split(".")[0]
+                  for name in json.loads(result.stdout.splitlines()[-1])}
+        eager = sorted(set(settings.LAZY_IMPORTS) & loaded)
+        errors = []
+        if eager:
+            errors.append(
+                "При запуске импортированы модули, которые должны "
+                "загружаться при первом использовании: " + ", ".join(eager))
+        if options["budget"] is not None and total > options["budget"]:
+            errors.append(
+                f"Время импорта {total:.1f} ms превышает бюджет "
+                f"{options['budget']} ms")
+        if errors:
+            raise CommandError("\n".join(errors))
+        self.stdout.write(self.style.SUCCESS("Ленивые импорты не загружены."))
@@ -0,0 +1,57 @@
+import io
+import pstats
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.profiling import list_profiles, profile_path
+
+
+class Command(BaseCommand):
+    """
+    Команда просмотра профилей запросов, снятых ProfilingMiddleware.
+    """
+
+    help = "Показывает сохранённые профили запросов."
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest="action", required=True)
+        list_parser = subparsers.add_parser(
+            "list", help="Список профилей, новые первыми.")
+        list_parser.add_argument(
+            "--route", help="Только профили запросов к этому маршруту.")
+        show_parser = subparsers.add_parser(
+            "show", help="Самые затратные функции профиля.")
+        show_parser.add_argument("name", help="Имя профиля из списка.")
+        show_parser.add_argument(
+            "--sort", default="cumulative",
+            help="Ключ сортировки pstats: cumulative, tottime, calls.")
+        show_parser.add_argument(
+            "--limit", type=int, default=30,
+            help="Сколько функций показать.")
+
+    def handle(self, *args, **options):
+        if options["action"] == "list":
+            self.list(options["route"])
+        else:
+            self.show(options["name"], options["sort"], options["limit"])
+
+    def list(self, route):
+        for meta in list_profiles():
+            if route and meta["route"] != route:
+                continue
+            created = datetime.fromtimestamp(
+                int(meta["name"].split("-")[0]) / 1e9)
+            self.stdout.write(
+                f"{meta['name']}  {created:%Y-%m-%d %H:%M:%S}  "
+                f"{meta['duration'] * 1000:8.1f} ms  {meta['status']}  "
+                f"{meta['method']} {meta['path']}")
+
+    def show(self, name, sort, limit):
+        path = profile_path(name)
+        if not path.exists():
+            raise CommandError(f"Профиль {name} не найден.")
+        output = io.StringIO()
+        stats = pstats.Stats(str(path), stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        self.stdout.write(output.getvalue())
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.idempotency import prune_idempotency_keys
+
+
+class Command(BaseCommand):
+    """
+    Команда удаления устаревших ключей Idempotency-Key.
+    Запускается периодически, например из cron.
+    """
+
+    help = "Удаляет ключи Idempotency-Key старше IDEMPOTENCY_TTL."
+
+    def handle(self, *args, **options):
+        pruned = prune_idempotency_keys()
+        self.stdout.write(self.style.SUCCESS(f"Удалено ключей: {pruned}"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.shopping_list import prune_shopping_lists
+
+
+class Command(BaseCommand):
+    """
+    Команда удаления устаревших PDF списков покупок.
+    Запускается периодически, например из cron.
+    """
+
+    help = "Удаляет PDF списков покупок старше SHOPPING_LIST_TTL."
+
+    def handle(self, *args, **options):
+        pruned = prune_shopping_lists()
+        self.stdout.write(self.style.SUCCESS(f"Удалено файлов: {pruned}"))
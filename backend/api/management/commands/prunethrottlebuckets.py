@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.throttling import prune_buckets
+
+
+class Command(BaseCommand):
+    """
+    Команда удаления наполнившихся корзин ограничения запросов.
+    Запускается периодически, например из cron.
+    """
+
+    help = "Удаляет наполнившиеся корзины ограничения запросов."
+
+    def handle(self, *args, **options):
+        pruned = prune_buckets()
+        self.stdout.write(self.style.SUCCESS(f"Удалено корзин: {pruned}"))
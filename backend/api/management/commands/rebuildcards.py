@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.cards import build_cards, refresh_cards
+from recipes.models import Recipe, RecipeCard
+
+CARD_FIELDS = ("author_id", "pub_date", "tag_ids", "data")
+
+
+class Command(BaseCommand):
+    """
+    Команда перестройки карточек рецептов RecipeCard.
+    С ключом --check только сверяет карточки с рецептами и сообщает
+    об отсутствующих, устаревших и лишних карточках.
+    """
+
+    help = "Перестраивает или проверяет карточки рецептов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Только проверить карточки, ничего не меняя.")
+        parser.add_argument(
+            "--chunk-size", type=int, default=500,
+            help="Сколько рецептов обрабатывать за один проход.")
+
+    def handle(self, *args, **options):
+        recipe_ids = list(
+            Recipe.objects.order_by("id").values_list("id", flat=True))
+        orphans = list(RecipeCard.objects.exclude(
+            recipe_id__in=Recipe.objects.values("id")
+        ).values_list("recipe_id", flat=True))
+        if not options["check"]:
+            RecipeCard.objects.filter(recipe_id__in=orphans).delete()
+            refresh_cards(recipe_ids)
+            self.stdout.write(self.style.SUCCESS(
+                f"Перестроено карточек: {len(recipe_ids)}, "
+                f"удалено лишних: {len(orphans)}"))
+            return
+
+        missing, stale = [], []
+        chunk_size = options["chunk_size"]
+        for start in range(0, len(recipe_ids), chunk_size):
+            chunk = recipe_ids[start:start + chunk_size]
+            stored = RecipeCard.objects.in_bulk(chunk)
+            for card in build_cards(chunk):
+                current = stored.get(card.recipe_id)
+                if current is None:
+                    missing.append(card.recipe_id)
+                elif any(getattr(current, field) != getattr(card, field)
+                         for field in CARD_FIELDS):
+                    stale.append(card.recipe_id)
+        for title, ids in (("Нет карточек", missing),
+                           ("Устаревшие карточки", stale),
+                           ("Лишние карточки", orphans)):
+            if ids:
+                self.stdout.write(f"{title}: {', '.join(map(str, ids))}")
+        if missing or stale or orphans:
+            raise CommandError("Карточки рецептов не согласованы.")
+        self.stdout.write(self.style.SUCCESS("Карточки согласованы."))
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.3 on 2026-10-19 08:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThrottleBucket',
+            fields=[
+                ('key', models.CharField(max_length=200, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('tokens', models.FloatField(verbose_name='Токены')),
+                ('updated', models.FloatField(verbose_name='Обновлена')),
+            ],
+            options={
+                'verbose_name': 'Корзина ограничения запросов',
+                'verbose_name_plural': 'Корзины ограничения запросов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='throttlebucket',
+            index=models.Index(fields=['updated'], name='api_throttl_updated_29f78b_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from foodgram.hashers import HashingBusy, hashing_timeout
+from foodgram.metrics import timed
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Сервер перегружен, повторите вход позже."
+    default_code = "hashing_busy"
+
+
+class BoundedHashingMixin:
+    """
+    Ждёт слот хеширования паролей не дольше PASSWORD_HASHING_TIMEOUT
+    секунд: не дождавшийся слота запрос получает ответ 503,
+    а не занимает воркер.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with hashing_timeout(settings.PASSWORD_HASHING_TIMEOUT):
+            return super().dispatch(request, *args, **kwargs)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, HashingBusy):
+            exc = PasswordHashingBusy()
+        return super().handle_exception(exc)
+
+
+class FastListMixin:
+    """
+    Отдаёт list() через быстрый сериализатор по строкам .values(),
+    минуя создание моделей и сериализаторов DRF.
+    """
+
+    fast_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values(*self.fast_serializer.fields)
+        page = self.paginate_queryset(rows)
+        with timed("serialization_duration_seconds",
+                   serializer=self.basename):
+            data = self.fast_serializer.many(
+                rows if page is None else page)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
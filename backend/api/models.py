@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class ThrottleBucket(models.Model):
+    """
+    Класс хранит состояние корзины ограничения частоты запросов:
+    число токенов и время последнего обновления (Unix time).
+    Строка пополняется и расходуется одним атомарным запросом,
+    поэтому корзину согласованно расходуют все процессы и воркеры.
+    """
+
+    key = models.CharField(
+        verbose_name="Ключ", max_length=200, primary_key=True)
+    tokens = models.FloatField(verbose_name="Токены")
+    updated = models.FloatField(verbose_name="Обновлена")
+
+    class Meta:
+        verbose_name = "Корзина ограничения запросов"
+        verbose_name_plural = "Корзины ограничения запросов"
+        indexes = [models.Index(fields=["updated"])]
+
+    def __str__(self):
+        return f"{self.key}: {self.tokens:.2f}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Класс хранит ответ на POST-запрос с заголовком Idempotency-Key.
+    Пока запрос выполняется, status_code пуст. Уникальность ключа
+    у пользователя гарантирует база данных, поэтому один ключ
+    выполняется один раз во всех процессах.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name="Пользователь",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    key = models.CharField(verbose_name="Хеш ключа", max_length=64)
+    fingerprint = models.CharField(
+        verbose_name="Отпечаток запроса", max_length=64)
+    status_code = models.PositiveSmallIntegerField(
+        verbose_name="Статус ответа", null=True)
+    data = models.JSONField(
+        verbose_name="Тело ответа", null=True, encoder=DjangoJSONEncoder)
+    etag = models.CharField(verbose_name="ETag", max_length=100, blank=True)
+    created = models.DateTimeField(verbose_name="Создан")
+
+    class Meta:
+        verbose_name = "Ключ идемпотентности"
+        verbose_name_plural = "Ключи идемпотентности"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="unique_idempotency_key")
+        ]
+        indexes = [models.Index(fields=["created"])]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.key}"
@@ -1,6 +1,18 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class CustomPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = "limit"
+
+
+class FeedPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = "limit"
+    ordering = "-pub_date"
+
+
+class UserPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = "limit"
+    ordering = "id"
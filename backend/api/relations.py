@@ -0,0 +1,24 @@
+from django.db import connection
+
+
+def insert_relation(model, user_id, recipe_id):
+    """
+    Добавляет строку избранного или корзины одним запросом
+    INSERT ... ON CONFLICT DO NOTHING и возвращает True, если строка
+    добавлена, и False, если она уже была.
+    """
+
+    obj = model(user_id=user_id, recipe_id=recipe_id)
+    fields = [field for field in model._meta.concrete_fields
+              if not field.primary_key]
+    quote = connection.ops.quote_name
+    sql = "INSERT INTO {} ({}) VALUES ({}) ON CONFLICT DO NOTHING".format(
+        quote(model._meta.db_table),
+        ", ".join(quote(field.column) for field in fields),
+        ", ".join(["%s"] * len(fields)),
+    )
+    params = [field.get_db_prep_save(field.pre_save(obj, True), connection)
+              for field in fields]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount == 1
@@ -0,0 +1,48 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+LINE_SEPARATOR = "\u2028".encode()
+PARAGRAPH_SEPARATOR = "\u2029".encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson.
+    Строки (в том числе кириллица), целые, даты, Decimal и UUID
+    выводятся побайтно так же, как JSONRenderer. Отличаются только
+    числа с плавающей точкой, которых в ответах API нет:
+    экспоненциальная запись короче (1e16 вместо 1e+16, 1e-7
+    вместо 1e-07, 0.00001 вместо 1e-05), а NaN и бесконечности
+    выводятся как null, тогда как JSONRenderer в строгом режиме
+    отказывается их выводить.
+    Если orjson не установлен, запрошены отступы или данные ему
+    не по силам, работает JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer всегда экранирует U+2028 и U+2029.
+        if LINE_SEPARATOR in ret:
+            ret = ret.replace(LINE_SEPARATOR, b"\\u2028")
+        if PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(PARAGRAPH_SEPARATOR, b"\\u2029")
+        return ret
@@ -1,8 +1,15 @@
+import base64
+import binascii
+import json
+import uuid
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import TemporaryUploadedFile
 from django.db import transaction
-from django.db.models import F
+from django.db.models import F, Manager
+from django.http import QueryDict
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from recipes.models import (
     Favorite,
     Cart,
@@ -12,8 +19,12 @@ from recipes.models import (
     Tag)
 from rest_framework import serializers
 
-import webcolors
+from foodgram.metrics import timed
 from users.models import Follow
+from .cards import dirty_cards
+from .concurrency import Conflict, PreconditionFailed
+from .fast_serializers import RECIPE_PART, recipe_fragment, stored_fragment
+from .fragments import get_fragments, invalidate_fragments
 
 User = get_user_model()
 
@@ -32,8 +43,12 @@ class CustomUserSerializer(UserSerializer):
                   "last_name", "is_subscribed")
 
     def get_is_subscribed(self, obj):
+        # Списки пользователей приходят с аннотацией is_subscribed.
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         request = self.context.get("request")
-        if request is None or request.user.is_anonymous:
+        if (request is None or request.user.is_anonymous
+                or request.user.pk == obj.pk):
             return False
         return Follow.objects.filter(user=request.user, author=obj).exists()
 
@@ -63,6 +78,18 @@ class PasswordSerializer(serializers.Serializer):
                   "last_name", "is_subscribed")
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    """
+    Сериализатор списка id рецептов для пакетных операций.
+    """
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.RECIPES_BATCH_MAX_SIZE,
+    )
+
+
 class RecipePartSerializer(serializers.ModelSerializer):
     """
     Сериализатор рецепта для списка подписок.
@@ -114,8 +141,7 @@ class FollowSerializer(serializers.ModelSerializer):
             queryset = Recipe.objects.filter(author=obj.author)[:recipe_limit]
         else:
             queryset = Recipe.objects.filter(author=obj.author)
-        serializer = RecipePartSerializer(queryset, read_only=True, many=True)
-        return serializer.data
+        return RECIPE_PART.many(queryset.values(*RECIPE_PART.fields))
 
     def get_recipes_count(self, obj):
         return obj.author.recipes.count()
@@ -155,6 +181,8 @@ class HexColorField(serializers.CharField):
         return value
 
     def to_internal_value(self, data):
+        import webcolors
+
         try:
             data = webcolors.hex_to_name(data)
         except ValueError:
@@ -162,6 +190,76 @@ class HexColorField(serializers.CharField):
         return data
 
 
+class Base64ImageField(serializers.ImageField):
+    """
+    Поле изображения рецепта.
+    Принимает файл из multipart-запроса или строку base64 в формате
+    data URI. Строка base64 уже целиком в памяти после разбора JSON,
+    но не копируется: она читается частями по CHUNK_SIZE символов,
+    декодируется во временный файл на диске, а изображение проверяется
+    по заголовку без полного декодирования. Для больших файлов
+    дешевле multipart: его Django сразу пишет на диск.
+    Пробельные символы внутри base64 пропускаются, недостающее
+    выравнивание знаками = в конце строки допускается.
+    """
+
+    ALLOWED_TYPES = ("jpeg", "jpg", "png", "gif", "webp")
+    BASE64_MARK = ";base64,"
+    CHUNK_SIZE = 64 * 1024
+    WHITESPACE = dict.fromkeys(map(ord, " \t\n\r\f\v"))
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = self.decode_base64(data)
+        elif getattr(data, "size", 0) > settings.RECIPE_IMAGE_MAX_SIZE:
+            raise serializers.ValidationError(
+                "Слишком большое изображение.")
+        return super().to_internal_value(data)
+
+    def iter_decoded(self, data, start):
+        """
+        Декодированные части строки base64 data, начиная с позиции start.
+        Хвост части, не кратный четырём символам, переносится
+        в следующую часть.
+        """
+
+        rest = ""
+        for offset in range(start, len(data), self.CHUNK_SIZE):
+            chunk = rest + data[offset:offset + self.CHUNK_SIZE].translate(
+                self.WHITESPACE)
+            complete = len(chunk) - len(chunk) % 4
+            rest = chunk[complete:]
+            yield base64.b64decode(chunk[:complete], validate=True)
+        if rest:
+            yield base64.b64decode(
+                rest + "=" * (-len(rest) % 4), validate=True)
+
+    def decode_base64(self, data):
+        mark = data.find(self.BASE64_MARK, 0, 100)
+        extension = data[:max(mark, 0)].rpartition("/")[2].lower()
+        if mark == -1 or extension not in self.ALLOWED_TYPES:
+            raise serializers.ValidationError(
+                "Ожидается изображение в формате base64.")
+        start = mark + len(self.BASE64_MARK)
+        if (len(data) - start) * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE:
+            raise serializers.ValidationError(
+                "Слишком большое изображение.")
+        image = TemporaryUploadedFile(
+            f"{uuid.uuid4().hex}.{extension}",
+            f"image/{extension}", 0, None,
+        )
+        try:
+            for part in self.iter_decoded(data, start):
+                image.write(part)
+        except binascii.Error:
+            image.close()
+            raise serializers.ValidationError(
+                "Некорректная строка base64.")
+        image.size = image.tell()
+        image.seek(0)
+        return image
+
+
 class TagSerializer(serializers.ModelSerializer):
     """
     Сериализатор тегов.
@@ -216,8 +314,117 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit", "amount")
 
 
+class RecipeAuthorSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор автора рецепта без данных о подписке.
+    """
+
+    class Meta:
+        model = User
+        fields = ("email", "id", "username", "first_name", "last_name")
+
+
 class RecipeGetSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор не зависящей от пользователя части рецепта.
+    Его результат кэшируется как фрагмент рецепта.
+    """
+
     tags = TagSerializer(many=True)
+    author = RecipeAuthorSerializer()
+    ingredients = IngredientAmountSerializer(
+        source="ingredient_in_recipe", many=True
+    )
+
+    class Meta:
+        model = Recipe
+        fields = (
+            "id",
+            "tags",
+            "name",
+            "author",
+            "ingredients",
+            "image",
+            "text",
+            "cooking_time",
+        )
+
+
+def render_recipe_fragments(recipe_ids):
+    recipes = (
+        Recipe.objects.filter(pk__in=recipe_ids)
+        .select_related("author")
+        .prefetch_related("tags", "ingredient_in_recipe__ingredient")
+    )
+    return {recipe.id: recipe_fragment(recipe) for recipe in recipes}
+
+
+def represent_recipes(recipes, request):
+    """
+    Собирает представления рецептов из кэшированных фрагментов
+    и флагов текущего пользователя, вычисленных пакетно.
+    """
+
+    with timed("serialization_duration_seconds", serializer="recipes"):
+        fragments = get_fragments(
+            [recipe.id for recipe in recipes], render_recipe_fragments)
+        return with_user_flags(
+            [fragments[recipe.id] for recipe in recipes], request)
+
+
+def represent_cards(cards, request):
+    """
+    Собирает представления рецептов из карточек RecipeCard.
+    """
+
+    with timed("serialization_duration_seconds", serializer="recipe_cards"):
+        return with_user_flags(
+            [stored_fragment(card.data) for card in cards], request)
+
+
+def with_user_flags(fragments, request):
+    """
+    Дополняет фрагменты рецептов флагами текущего пользователя,
+    вычисленными тремя запросами на всю страницу.
+    """
+
+    favorited, in_cart, subscribed = set(), set(), set()
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        recipe_ids = [fragment["id"] for fragment in fragments]
+        favorited = set(Favorite.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).values_list("recipe_id", flat=True))
+        in_cart = set(Cart.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).values_list("recipe_id", flat=True))
+        subscribed = set(Follow.objects.filter(
+            user=user,
+            author_id__in={fragment["author"]["id"] for fragment in fragments}
+        ).values_list("author_id", flat=True))
+    return [
+        {
+            **fragment,
+            "author": {
+                **fragment["author"],
+                "is_subscribed": fragment["author"]["id"] in subscribed,
+            },
+            "is_favorited": fragment["id"] in favorited,
+            "is_in_shopping_cart": fragment["id"] in in_cart,
+        }
+        for fragment in fragments
+    ]
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """
+    Сериализатор списка рецептов: вся страница собирается
+    за фиксированное число обращений к кэшу и базе данных.
+    """
+
+    def to_representation(self, data):
+        recipes = data.all() if isinstance(data, Manager) else data
+        return represent_recipes(list(recipes), self.context.get("request"))
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -252,6 +459,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             "is_favorited",
             "is_in_shopping_cart",
         )
+        list_serializer_class = RecipeListSerializer
 
     def is_exists_in(self, obj, model):
         request = self.context.get("request")
@@ -274,8 +482,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         ).exists()
 
     def to_representation(self, instance):
-        serializer = RecipeGetSerializer(instance)
-        return serializer.data
+        return represent_recipes([instance], self.context.get("request"))[0]
 
 
 class RecipeAddSerializer(serializers.ModelSerializer):
@@ -326,57 +533,112 @@ class RecipeAddSerializer(serializers.ModelSerializer):
             )
         IngredientForRecipe.objects.bulk_create(bulk_list)
 
+    def to_internal_value(self, data):
+        if isinstance(data, QueryDict):
+            # В multipart-запросе вложенные поля передаются строками JSON.
+            data = data.dict()
+            for field in ("ingredients", "tags"):
+                if isinstance(data.get(field), str):
+                    try:
+                        data[field] = json.loads(data[field])
+                    except ValueError:
+                        raise serializers.ValidationError(
+                            {field: "Некорректный JSON."})
+        return super().to_internal_value(data)
+
+    def merge_ingredients(self, ingredients):
+        """
+        Количество каждого ингредиента; повторы складываются.
+        """
+
+        amounts = {}
+        for item in ingredients:
+            ingredient_id = item["ingredient"].id
+            amounts[ingredient_id] = amounts.get(ingredient_id, 0) + item[
+                "amount"]
+        return amounts
+
+    def recipe_written(self, recipe):
+        # Ингредиенты пишутся пакетно, без сигналов post_save.
+        invalidate_fragments([recipe.pk])
+        dirty_cards.add([recipe.pk])
+
+    def save(self, **kwargs):
+        image = self.validated_data.get("image")
+        try:
+            return super().save(**kwargs)
+        finally:
+            # Хранилище перемещает временный файл изображения. Закрытый
+            # файл не пытается удалить его повторно при сборке мусора.
+            if image is not None:
+                image.close()
+
     @transaction.atomic
     def create(self, validated_data):
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
-
+        tags = validated_data.pop("tags")
+        amounts = self.merge_ingredients(
+            validated_data.pop("ingredient_in_recipe"))
         recipe = Recipe.objects.create(**validated_data)
+        IngredientForRecipe.objects.bulk_create(
+            IngredientForRecipe(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+            for ingredient_id, amount in amounts.items()
+        )
         recipe.tags.set(tags)
-
-        for ingredient_data in ingredients:
-            ingredient = Ingredient.objects.get(id=ingredient_data['id'])
-            amount = ingredient_data['amount']
-            existing_recipe_ingredient = IngredientForRecipe.objects.filter(
-                recipe=recipe, ingredient=ingredient).first()
-            if existing_recipe_ingredient:
-                existing_recipe_ingredient.amount += amount
-                existing_recipe_ingredient.save()
-            else:
-                IngredientForRecipe.objects.create(
-                    recipe=recipe, ingredient=ingredient, amount=amount)
-
+        self.recipe_written(recipe)
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
+        """
+        Обновляет рецепт с оптимистической блокировкой: версия
+        увеличивается условным UPDATE, который не пройдёт, если рецепт
+        успел изменить другой запрос. Ингредиенты обновляются
+        по разнице со старым составом.
+        """
+
+        expected = self.context.get("expected_version", instance.version)
+        if not Recipe.objects.filter(
+            pk=instance.pk, version=expected
+        ).update(version=F("version") + 1):
+            if "expected_version" in self.context:
+                raise PreconditionFailed
+            raise Conflict
+        instance.version = expected + 1
+        tags = validated_data.pop("tags", None)
+        ingredients = validated_data.pop("ingredient_in_recipe", None)
         instance = super().update(instance, validated_data)
-        instance.tags.clear()
-        instance.tags.set(tags)
-
-        IngredientForRecipe.objects.filter(recipe=instance).delete()
-        for ingredient_data in ingredients:
-            ingredient = Ingredient.objects.get(id=ingredient_data['id'])
-            amount = ingredient_data['amount']
-
-            recipe_ingredient, created = (
-                IngredientForRecipe.objects.get_or_create(
-                    recipe=instance,
-                    ingredient=ingredient,
-                    defaults={'amount': amount}
-                )
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            amounts = self.merge_ingredients(ingredients)
+            current = {
+                row.ingredient_id: row
+                for row in IngredientForRecipe.objects.filter(recipe=instance)
+            }
+            IngredientForRecipe.objects.filter(pk__in=[
+                row.pk for ingredient_id, row in current.items()
+                if ingredient_id not in amounts
+            ]).delete()
+            changed = []
+            for ingredient_id, amount in amounts.items():
+                row = current.get(ingredient_id)
+                if row is not None and row.amount != amount:
+                    row.amount = amount
+                    changed.append(row)
+            IngredientForRecipe.objects.bulk_update(changed, ["amount"])
+            IngredientForRecipe.objects.bulk_create(
+                IngredientForRecipe(
+                    recipe=instance, ingredient_id=ingredient_id,
+                    amount=amount)
+                for ingredient_id, amount in amounts.items()
+                if ingredient_id not in current
             )
-
-            if not created:
-                recipe_ingredient.amount = F('amount') + amount
-                recipe_ingredient.save()
-
+        self.recipe_written(instance)
         return instance
 
     def to_representation(self, instance):
-        serializer = RecipeGetSerializer(
+        serializer = RecipeSerializer(
             instance, context={"request": self.context.get("request")}
         )
         return serializer.data
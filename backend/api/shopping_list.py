@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Sum
+
+from recipes.models import IngredientForRecipe
+from recipes.units import canonical_amount, canonical_unit, format_amount
+
+FONT_NAME = "ShoppingListFont"
+
+
+def get_shopping_list(user_id):
+    """
+    Суммарное количество каждого ингредиента из рецептов в корзине.
+    Количества переводятся в канонические единицы и складываются в SQL.
+    """
+
+    return list(
+        IngredientForRecipe.objects.filter(recipe__shopping_cart__user=user_id)
+        .annotate(unit=canonical_unit("ingredient__measurement_unit"))
+        .values_list("ingredient__name", "unit")
+        .annotate(total=Sum(canonical_amount(
+            "ingredient__measurement_unit", "amount")))
+        .order_by("ingredient__name", "unit")
+    )
+
+
+def shopping_list_path(rows):
+    """
+    Путь к PDF для данного состава корзины. Имя файла — хеш содержимого,
+    поэтому одинаковые корзины делят один файл, а изменение корзины
+    или рецептов в ней само ведёт к новому файлу.
+    """
+
+    key = hashlib.sha256(
+        json.dumps(rows, ensure_ascii=False).encode()).hexdigest()
+    return Path(settings.SHOPPING_LIST_ROOT) / f"{key}.pdf"
+
+
+def render_pdf(rows, path):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(FONT_NAME, settings.SHOPPING_LIST_FONT))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Пишем во временный файл и атомарно переименовываем, чтобы
+    # параллельный запрос не отдал недописанный PDF.
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    pdf = canvas.Canvas(tmp_name, pagesize=A4)
+    width, height = A4
+    y = height - 60
+    pdf.setFont(FONT_NAME, 18)
+    pdf.drawString(50, y, "Список покупок")
+    pdf.setFont(FONT_NAME, 12)
+    for name, unit, total in rows:
+        y -= 20
+        if y < 50:
+            pdf.showPage()
+            pdf.setFont(FONT_NAME, 12)
+            y = height - 60
+        pdf.drawString(50, y, f"• {name} — {format_amount(total, unit)}")
+    pdf.save()
+    os.replace(tmp_name, path)
+
+
+def prune_shopping_lists():
+    """
+    Удаляет файлы, к которым не обращались дольше SHOPPING_LIST_TTL,
+    и возвращает их число. Запускается периодически командой
+    pruneshoppinglists.
+    """
+
+    expired = time.time() - settings.SHOPPING_LIST_TTL
+    root = Path(settings.SHOPPING_LIST_ROOT)
+    if not root.exists():
+        return 0
+    pruned = 0
+    for entry in os.scandir(root):
+        if entry.stat().st_mtime < expired:
+            Path(entry.path).unlink(missing_ok=True)
+            pruned += 1
+    return pruned
+
+
+def ensure_shopping_list(user_id):
+    """
+    Возвращает путь к PDF со списком покупок, отрисовывая его
+    только если для этого состава корзины файла ещё нет.
+    """
+
+    rows = get_shopping_list(user_id)
+    path = shopping_list_path(rows)
+    if path.exists():
+        path.touch()
+    else:
+        render_pdf(rows, path)
+    return path
@@ -0,0 +1,153 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import (
+    Cart,
+    Favorite,
+    Ingredient,
+    IngredientForRecipe,
+    Recipe,
+    StaleSimilarity,
+    Tag)
+from users.models import Follow
+from .batching import CommitBatch
+from .cards import dirty_cards
+from .feed import count_follower, trim_follow
+from .fragments import invalidate_all_fragments, invalidate_fragments
+from .ingredients import invalidate_ingredients
+from .tag_snapshot import invalidate_tag_snapshot
+from .tasks import (
+    backfill_follow,
+    fan_out_recipe,
+    refresh_author_cards,
+    refresh_ingredient_cards,
+    refresh_tag_cards,
+    render_shopping_list)
+
+User = get_user_model()
+
+PRIVATE_FIELDS = {"last_login", "password"}
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_fragments([instance.pk])
+    dirty_cards.add([instance.pk])
+
+
+@receiver((post_save, post_delete), sender=IngredientForRecipe)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    invalidate_fragments([instance.recipe_id])
+    dirty_cards.add([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        invalidate_fragments([instance.pk])
+        dirty_cards.add([instance.pk])
+    elif pk_set:
+        invalidate_fragments(pk_set)
+        dirty_cards.add(pk_set)
+    else:
+        invalidate_all_fragments()
+        tag_id = instance.pk
+        transaction.on_commit(lambda: refresh_tag_cards.delay(tag_id))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+def dictionary_changed(sender, instance, **kwargs):
+    invalidate_all_fragments()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, instance, created=False, **kwargs):
+    invalidate_tag_snapshot()
+    if not created:
+        tag_id = instance.pk
+        transaction.on_commit(lambda: refresh_tag_cards.delay(tag_id))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_dictionary_changed(sender, instance, **kwargs):
+    invalidate_ingredients()
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(
+            lambda: refresh_ingredient_cards.delay(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields and set(update_fields) <= PRIVATE_FIELDS:
+        return
+    invalidate_fragments(
+        list(instance.recipes.values_list("id", flat=True)))
+    transaction.on_commit(lambda: refresh_author_cards.delay(instance.pk))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: fan_out_recipe.delay(instance.pk))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        count_follower(instance.author_id, 1)
+        transaction.on_commit(
+            lambda: backfill_follow.delay(
+                instance.user_id, instance.author_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    count_follower(instance.author_id, -1)
+    trim_follow(instance.user_id, instance.author_id)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=Cart)
+def recipe_relation_changed(sender, instance, **kwargs):
+    StaleSimilarity.objects.bulk_create(
+        [StaleSimilarity(recipe_id=instance.recipe_id)],
+        ignore_conflicts=True,
+    )
+
+
+def render_shopping_lists(user_ids):
+    for user_id in user_ids:
+        render_shopping_list.delay(user_id)
+
+
+# Пакетное удаление корзины или каскад от удаления рецепта шлют сигнал
+# на каждую строку: список покупок перерисовывается раз на пользователя.
+shopping_lists = CommitBatch(render_shopping_lists)
+
+
+@receiver((post_save, post_delete), sender=Cart)
+def cart_changed(sender, instance, **kwargs):
+    shopping_lists.add([instance.user_id])
+
+
+def relations_bulk_created(model, user_id, recipe_ids):
+    """
+    Выполняет работу обработчиков post_save для строк избранного
+    или корзины, созданных через bulk_create, который сигналов не шлёт.
+    """
+
+    StaleSimilarity.objects.bulk_create(
+        [StaleSimilarity(recipe_id=pk) for pk in recipe_ids],
+        ignore_conflicts=True,
+    )
+    if model is Cart and recipe_ids:
+        shopping_lists.add([user_id])
@@ -0,0 +1,74 @@
+import hashlib
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from foodgram.metrics import cache_result
+from recipes.models import Tag
+from .fast_serializers import TAG
+from .renderers import FastJSONRenderer
+
+GENERATION_KEY = "tags:generation"
+
+TagSnapshot = namedtuple(
+    "TagSnapshot", ("generation", "rows", "by_id", "by_slug", "payload",
+                    "etag"))
+
+snapshot = None
+checked_at = 0.0
+lock = threading.Lock()
+
+
+def build_snapshot(generation):
+    rows = tuple(TAG.many(Tag.objects.values(*TAG.fields)))
+    payload = FastJSONRenderer().render(list(rows))
+    return TagSnapshot(
+        generation=generation,
+        rows=rows,
+        by_id=MappingProxyType({row["id"]: row for row in rows}),
+        by_slug=MappingProxyType({row["slug"]: row["id"] for row in rows}),
+        payload=payload,
+        etag='"{}"'.format(hashlib.md5(payload).hexdigest()),
+    )
+
+
+def get_tag_snapshot():
+    """
+    Неизменяемый снимок всех тегов в памяти процесса вместе с готовым
+    JSON-ответом и его ETag. Поколение снимка сверяется с общим кэшем
+    не чаще раза в TAGS_SNAPSHOT_CHECK_INTERVAL секунд.
+    """
+
+    global snapshot, checked_at
+    now = time.monotonic()
+    current = snapshot
+    if (current is not None
+            and now - checked_at < settings.TAGS_SNAPSHOT_CHECK_INTERVAL):
+        cache_result("tag_snapshot", 1, 0)
+        return current
+    generation = cache.get_or_set(GENERATION_KEY, time.time_ns, None)
+    with lock:
+        stale = snapshot is None or snapshot.generation != generation
+        cache_result("tag_snapshot", not stale, stale)
+        if stale:
+            snapshot = build_snapshot(generation)
+        checked_at = now
+        return snapshot
+
+
+def invalidate_tag_snapshot():
+    """
+    Начинает новое поколение снимка после фиксации транзакции.
+    """
+
+    def invalidate():
+        global snapshot
+        cache.set(GENERATION_KEY, time.time_ns(), None)
+        snapshot = None
+
+    transaction.on_commit(invalidate)
@@ -0,0 +1,43 @@
+from recipes.models import IngredientForRecipe, Recipe, RecipeCard
+from taskqueue.registry import task
+from . import feed
+from .cards import refresh_cards
+from .shopping_list import ensure_shopping_list
+
+
+@task()
+def fan_out_recipe(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        "id", "author_id", "pub_date").first()
+    if recipe is not None:
+        feed.fan_out_recipe(recipe)
+
+
+@task()
+def backfill_follow(user_id, author_id):
+    feed.backfill_follow(user_id, author_id)
+
+
+@task()
+def render_shopping_list(user_id):
+    ensure_shopping_list(user_id)
+
+
+# Изменение автора, тега или ингредиента затрагивает карточки многих
+# рецептов: они перестраиваются воркером, а не в запросе.
+@task()
+def refresh_author_cards(author_id):
+    refresh_cards(Recipe.objects.filter(
+        author_id=author_id).values_list("id", flat=True))
+
+
+@task()
+def refresh_tag_cards(tag_id):
+    refresh_cards(RecipeCard.objects.filter(
+        tag_ids__contains=[tag_id]).values_list("recipe_id", flat=True))
+
+
+@task()
+def refresh_ingredient_cards(ingredient_id):
+    refresh_cards(IngredientForRecipe.objects.filter(
+        ingredient_id=ingredient_id).values_list("recipe_id", flat=True))
@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.db import transaction
+from django.test import override_settings
+
+from api.cards import dirty_cards, refresh_cards
+from api.tasks import refresh_ingredient_cards
+from recipes.models import IngredientForRecipe, RecipeCard
+from taskqueue.models import Task
+from .utils import (
+    FoodgramTestCase,
+    create_ingredients,
+    create_recipe,
+    create_tag,
+    create_user)
+
+
+class RecipeCardTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.salt, self.sugar = create_ingredients(2)
+        self.tag = create_tag("breakfast")
+        self.recipe = create_recipe(
+            self.author, "Каша", tags=[self.tag],
+            ingredients=[(self.salt, 5), (self.sugar, 10)])
+
+    def card(self):
+        return RecipeCard.objects.get(pk=self.recipe.pk)
+
+    def test_one_rebuild_per_transaction(self):
+        with mock.patch.object(dirty_cards, "handler") as handler, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.recipe.name = "Овсянка"
+            self.recipe.save()
+            self.recipe.tags.clear()
+            IngredientForRecipe.objects.filter(recipe=self.recipe).delete()
+        handler.assert_called_once_with({self.recipe.pk})
+
+    def test_rolled_back_keys_are_dropped(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            dirty_cards.add([0])
+            raise RuntimeError
+        with mock.patch.object(dirty_cards, "handler") as handler, \
+                self.captureOnCommitCallbacks(execute=True):
+            dirty_cards.add([self.recipe.pk])
+        handler.assert_called_once_with({self.recipe.pk})
+
+    def test_rebuild_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.name = "Овсянка"
+            self.recipe.save()
+            self.recipe.tags.clear()
+            self.assertEqual(self.card().data["name"], "Каша")
+        card = self.card()
+        self.assertEqual(card.data["name"], "Овсянка")
+        self.assertEqual(card.tag_ids, [])
+
+    def test_refresh_updates_in_place_and_drops_deleted(self):
+        refresh_cards([self.recipe.pk])
+        refresh_cards([self.recipe.pk])
+        self.assertEqual(self.card().tag_ids, [self.tag.pk])
+        recipe_id = self.recipe.pk
+        self.recipe.delete()
+        refresh_cards([recipe_id])
+        self.assertFalse(RecipeCard.objects.exists())
+
+    @override_settings(TASKS_EAGER=False)
+    def test_ingredient_edit_goes_through_queue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salt.name = "Соль"
+            self.salt.save()
+        task = Task.objects.get(name="api.tasks.refresh_ingredient_cards")
+        self.assertNotIn(
+            "Соль", [item["name"] for item in self.card().data["ingredients"]])
+        refresh_ingredient_cards(*task.args)
+        self.assertIn(
+            "Соль", [item["name"] for item in self.card().data["ingredients"]])
+
+    @override_settings(TASKS_EAGER=False)
+    def test_author_edit_goes_through_queue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.first_name = "Иван"
+            self.author.save()
+        self.assertTrue(Task.objects.filter(
+            name="api.tasks.refresh_author_cards",
+            args=[self.author.pk]).exists())
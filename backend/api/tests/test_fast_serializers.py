@@ -0,0 +1,171 @@
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, tag
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import (
+    INGREDIENT,
+    RECIPE_PART,
+    TAG,
+    recipe_fragment,
+    stored_fragment)
+from api.serializers import (
+    CustomUserSerializer,
+    IngredientSerializer,
+    RecipeGetSerializer,
+    RecipePartSerializer,
+    RecipeSerializer,
+    TagSerializer,
+    represent_cards,
+    represent_recipes)
+from recipes.models import Cart, Favorite, Ingredient, Recipe, RecipeCard, Tag
+from users.models import Follow
+from .utils import (
+    FoodgramTestCase,
+    benchmark_scale,
+    create_ingredients,
+    create_recipe,
+    create_tag,
+    create_user,
+    measure,
+    report)
+
+
+def prefetched_recipes():
+    return (
+        Recipe.objects.select_related("author")
+        .prefetch_related("tags", "ingredient_in_recipe__ingredient")
+        .order_by("id")
+    )
+
+
+def reversed_keys(value):
+    """
+    Значение с обратным порядком ключей во всех словарях,
+    как их может вернуть jsonb.
+    """
+
+    if isinstance(value, dict):
+        return {key: reversed_keys(value[key]) for key in reversed(value)}
+    if isinstance(value, list):
+        return [reversed_keys(item) for item in value]
+    return value
+
+
+def drf_representation(recipe, request):
+    """
+    Представление рецепта, собранное сериализаторами DRF.
+    """
+
+    context = {"request": request}
+    data = dict(RecipeGetSerializer(recipe).data)
+    data["author"] = CustomUserSerializer(recipe.author, context=context).data
+    serializer = RecipeSerializer(context=context)
+    data["is_favorited"] = serializer.get_is_favorited(recipe)
+    data["is_in_shopping_cart"] = serializer.get_is_in_shopping_cart(recipe)
+    return data
+
+
+class FastSerializerEquivalenceTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.reader = create_user("reader")
+        self.author = create_user("author")
+        self.other = create_user("other")
+        tags = [create_tag("breakfast"), create_tag("dinner")]
+        ingredients = create_ingredients(3)
+        self.favorite = create_recipe(
+            self.author, "Блины", tags=tags,
+            ingredients=[(ingredients[0], 200), (ingredients[2], 3)],
+            text="Смешать муку и молоко.")
+        self.in_cart = create_recipe(
+            self.other, "Суп", tags=tags[1:],
+            ingredients=[(ingredients[1], 1)])
+        self.plain = create_recipe(self.reader, "Каша")
+        Favorite.objects.create(user=self.reader, recipe=self.favorite)
+        Cart.objects.create(user=self.reader, recipe=self.in_cart)
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def request(self, user):
+        request = RequestFactory().get("/api/recipes/")
+        request.user = user
+        return request
+
+    def assertSameJSON(self, first, second):
+        self.assertEqual(
+            JSONRenderer().render(first), JSONRenderer().render(second))
+
+    def test_recipe_fragment(self):
+        for recipe in prefetched_recipes():
+            self.assertSameJSON(
+                recipe_fragment(recipe), RecipeGetSerializer(recipe).data)
+
+    def test_stored_fragment_key_order(self):
+        for recipe in prefetched_recipes():
+            fragment = recipe_fragment(recipe)
+            self.assertSameJSON(
+                stored_fragment(reversed_keys(fragment)), fragment)
+
+    def test_represent_recipes_and_cards(self):
+        recipes = list(prefetched_recipes())
+        for card in RecipeCard.objects.all():
+            card.data = reversed_keys(card.data)
+            card.save(update_fields=["data"])
+        cards = RecipeCard.objects.order_by("recipe_id")
+        for user in (self.reader, self.author, AnonymousUser()):
+            request = self.request(user)
+            expected = [drf_representation(recipe, request)
+                        for recipe in recipes]
+            self.assertSameJSON(represent_recipes(recipes, request), expected)
+            self.assertSameJSON(represent_cards(cards, request), expected)
+
+    def test_dictionaries(self):
+        self.assertSameJSON(
+            RECIPE_PART.many(
+                Recipe.objects.order_by("id").values(*RECIPE_PART.fields)),
+            RecipePartSerializer(
+                Recipe.objects.order_by("id"), many=True).data)
+        self.assertSameJSON(
+            TAG.many(Tag.objects.values(*TAG.fields)),
+            TagSerializer(Tag.objects.all(), many=True).data)
+        self.assertSameJSON(
+            INGREDIENT.many(Ingredient.objects.values(*INGREDIENT.fields)),
+            IngredientSerializer(Ingredient.objects.all(), many=True).data)
+
+
+@tag("benchmark")
+class FastSerializerBenchmark(FoodgramTestCase):
+    """
+    Сериализация страницы из 1000 рецептов и 1000 ингредиентов
+    сериализаторами DRF и быстрыми сериализаторами.
+    """
+
+    def setUp(self):
+        super().setUp()
+        size = int(1000 * benchmark_scale())
+        author = create_user("author")
+        tags = [create_tag(f"tag{index}") for index in range(3)]
+        ingredients = create_ingredients(size)
+        for index in range(size):
+            create_recipe(
+                author, f"recipe{index}", tags=tags[:index % 3 + 1],
+                ingredients=[(ingredients[(index + item) % size], item + 1)
+                             for item in range(5)],
+                text="Нарезать, перемешать и запечь. " * 20)
+
+    def test_page(self):
+        recipes = list(prefetched_recipes())
+        rows = list(Ingredient.objects.values(*INGREDIENT.fields))
+        objects = list(Ingredient.objects.all())
+        report(f"Сериализация {len(recipes)} рецептов и ингредиентов", [
+            ("RecipeGetSerializer",
+             *measure(lambda: RecipeGetSerializer(recipes, many=True).data,
+                      repeat=5)),
+            ("recipe_fragment",
+             *measure(lambda: [recipe_fragment(r) for r in recipes],
+                      repeat=5)),
+            ("IngredientSerializer",
+             *measure(lambda: IngredientSerializer(objects, many=True).data,
+                      repeat=5)),
+            ("INGREDIENT.many", *measure(lambda: INGREDIENT.many(rows),
+                                         repeat=5)),
+        ])
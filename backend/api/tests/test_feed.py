@@ -0,0 +1,83 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.test import override_settings
+
+from api import feed
+from recipes.models import FeedEntry
+from users.models import Follow, User
+from .utils import FoodgramTestCase, create_recipe, create_user
+
+
+class FeedBackfillTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.reader = create_user("reader")
+        self.author = create_user("author")
+        self.recipes = [create_recipe(self.author, f"recipe{index}")
+                        for index in range(3)]
+
+    def feed_recipe_ids(self):
+        return set(FeedEntry.objects.filter(
+            user=self.reader).values_list("recipe_id", flat=True))
+
+    def test_backfill_after_follow(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        feed.backfill_follow(self.reader.id, self.author.id)
+        self.assertEqual(
+            self.feed_recipe_ids(), {recipe.id for recipe in self.recipes})
+
+    def test_backfill_after_unfollow_leaves_feed_empty(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        # Отписка успела раньше, чем воркер взял задачу заполнения.
+        follow.delete()
+        feed.backfill_follow(self.reader.id, self.author.id)
+        self.assertEqual(self.feed_recipe_ids(), set())
+
+    def test_unfollow_trims_feed(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        feed.backfill_follow(self.reader.id, self.author.id)
+        follow.delete()
+        self.assertEqual(self.feed_recipe_ids(), set())
+
+
+class HeavyAuthorTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.reader = create_user("reader")
+        self.other = create_user("other")
+        self.author = create_user("author")
+        self.recipe = create_recipe(self.author, "recipe")
+
+    def follower_count(self):
+        return User.objects.get(pk=self.author.pk).follower_count
+
+    def test_follower_count_follows_subscriptions(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        self.assertEqual(self.follower_count(), 2)
+        follow.delete()
+        self.assertEqual(self.follower_count(), 1)
+        self.other.delete()
+        self.assertEqual(self.follower_count(), 0)
+
+    def test_migration_counts_existing_followers(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        User.objects.update(follower_count=5)
+        migration = import_module("users.migrations.0006_user_follower_count")
+        migration.count_followers(apps, None)
+        self.assertEqual(
+            dict(User.objects.values_list("username", "follower_count")),
+            {"reader": 0, "other": 0, "author": 1})
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_heavy_author_is_pulled_on_read(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        FeedEntry.objects.all().delete()
+        feed.fan_out_recipe(self.recipe)
+        self.assertFalse(FeedEntry.objects.exists())
+        with self.assertNumQueries(2):
+            feed.pull_heavy_authors(self.reader)
+        self.assertEqual(
+            list(FeedEntry.objects.values_list("user_id", "recipe_id")),
+            [(self.reader.pk, self.recipe.pk)])
@@ -0,0 +1,133 @@
+from django.db import connection
+from django.test import RequestFactory, tag
+
+from api.filters import RecipeFilter
+from recipes.models import Cart, Favorite, Recipe
+from .utils import (
+    FoodgramTestCase,
+    benchmark_scale,
+    create_recipe,
+    create_tag,
+    create_user,
+    measure,
+    report)
+
+
+class RecipeFilterTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user("reader")
+        self.author = create_user("author")
+        self.breakfast = create_tag("breakfast")
+        self.dinner = create_tag("dinner")
+        self.both = create_recipe(
+            self.author, "both", tags=(self.breakfast, self.dinner))
+        self.morning = create_recipe(
+            self.author, "morning", tags=(self.breakfast,))
+        self.plain = create_recipe(self.author, "plain")
+        Favorite.objects.create(user=self.user, recipe=self.both)
+        Cart.objects.create(user=self.user, recipe=self.morning)
+
+    def filter(self, **params):
+        request = RequestFactory().get("/api/recipes/", params)
+        request.user = self.user
+        return RecipeFilter(
+            request.GET, queryset=Recipe.objects.all(), request=request).qs
+
+    def test_is_favorited(self):
+        self.assertQuerysetEqual(
+            self.filter(is_favorited=1), [self.both], ordered=False)
+
+    def test_is_in_shopping_cart(self):
+        self.assertQuerysetEqual(
+            self.filter(is_in_shopping_cart=1), [self.morning],
+            ordered=False)
+
+    def test_tags_any_does_not_duplicate_rows(self):
+        self.assertQuerysetEqual(
+            self.filter(tags=["breakfast", "dinner"]),
+            [self.both, self.morning], ordered=False)
+
+    def test_tags_all(self):
+        self.assertQuerysetEqual(
+            self.filter(tags=["breakfast", "dinner"], tags_mode="all"),
+            [self.both], ordered=False)
+
+    def test_conditions_compile_to_exists(self):
+        sql = str(self.filter(
+            tags=["breakfast"], is_favorited=1, is_in_shopping_cart=1
+        ).query).upper()
+        self.assertEqual(sql.count("EXISTS"), 3)
+        self.assertNotIn("DISTINCT", sql)
+        self.assertNotIn(" JOIN ", sql)
+
+
+@tag("benchmark")
+class RecipeFilterBenchmark(FoodgramTestCase):
+    """
+    Фильтры EXISTS против соединения с DISTINCT при росте таблиц
+    избранного и корзины. Объём задаётся BENCHMARK_SCALE; на каждом
+    шаге печатаются время запросов и план фильтра EXISTS.
+    """
+
+    recipes = 200
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.tags = [create_tag(f"tag{index}") for index in range(5)]
+        self.recipe_ids = [
+            create_recipe(self.author, f"recipe{index}",
+                          tags=self.tags[index % 5:index % 5 + 2]).id
+            for index in range(self.recipes)
+        ]
+        self.users = [create_user(f"user{index}")
+                      for index in range(int(100 * benchmark_scale()))]
+        self.reader = self.users[0]
+
+    def grow(self, rows):
+        """
+        Догоняет таблицы избранного и корзины до rows строк каждую.
+        """
+
+        for model in (Favorite, Cart):
+            existing = model.objects.count()
+            model.objects.bulk_create(
+                (model(user=self.users[index // self.recipes % len(
+                    self.users)], recipe_id=self.recipe_ids[
+                        index % self.recipes])
+                 for index in range(existing, rows)),
+                batch_size=5000, ignore_conflicts=True,
+            )
+
+    def test_filters_against_join_distinct(self):
+        request = RequestFactory().get("/api/recipes/")
+        request.user = self.reader
+        params = {"tags": ["tag1", "tag2"], "is_favorited": "1",
+                  "is_in_shopping_cart": "1"}
+
+        def exists_query():
+            return list(RecipeFilter(
+                params, queryset=Recipe.objects.all(), request=request
+            ).qs.values_list("id", flat=True))
+
+        def join_query():
+            return list(Recipe.objects.filter(
+                tags__slug__in=params["tags"],
+                favorites__user=self.reader,
+                shopping_cart__user=self.reader,
+            ).distinct().values_list("id", flat=True))
+
+        max_rows = self.recipes * len(self.users)
+        for rows in (max_rows // 100, max_rows // 10, max_rows):
+            self.grow(rows)
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+            self.assertCountEqual(exists_query(), join_query())
+            report(f"Фильтр рецептов, {rows} строк избранного и корзины", [
+                ("EXISTS", *measure(exists_query)),
+                ("JOIN + DISTINCT", *measure(join_query)),
+            ])
+            print(RecipeFilter(
+                params, queryset=Recipe.objects.all(), request=request
+            ).qs.explain())
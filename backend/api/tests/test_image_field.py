@@ -0,0 +1,138 @@
+import base64
+import gc
+import math
+import os
+import sys
+import tracemalloc
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, override_settings, tag
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from api.serializers import Base64ImageField
+from .utils import (
+    PNG,
+    FoodgramTestCase,
+    benchmark_scale,
+    create_ingredients,
+    create_tag,
+    create_user)
+
+
+def data_uri(payload, extension="png"):
+    return f"data:image/{extension};base64,{payload}"
+
+
+class Base64ImageFieldTest(SimpleTestCase):
+    def decode(self, value):
+        image = Base64ImageField().decode_base64(value)
+        try:
+            return image.read()
+        finally:
+            image.close()
+
+    def test_decodes_across_chunk_boundaries(self):
+        raw = os.urandom(Base64ImageField.CHUNK_SIZE * 2 + 7)
+        self.assertEqual(
+            self.decode(data_uri(base64.b64encode(raw).decode())), raw)
+
+    def test_skips_whitespace(self):
+        encoded = base64.b64encode(PNG * 50).decode()
+        wrapped = "\n".join(
+            encoded[start:start + 76] for start in range(0, len(encoded), 76))
+        self.assertEqual(self.decode(data_uri(" " + wrapped + "\r\n")),
+                         PNG * 50)
+
+    def test_accepts_missing_padding(self):
+        for raw in (PNG, PNG + b"x", PNG + b"xy"):
+            encoded = base64.b64encode(raw).decode().rstrip("=")
+            self.assertEqual(self.decode(data_uri(encoded)), raw)
+
+    def test_rejects_invalid_input(self):
+        for value in (
+            data_uri("*" * 8),
+            data_uri(base64.b64encode(PNG).decode() + "A"),
+            data_uri(base64.b64encode(PNG).decode(), "svg+xml"),
+            base64.b64encode(PNG).decode(),
+        ):
+            with self.subTest(value=value[:30]):
+                with self.assertRaises(serializers.ValidationError):
+                    self.decode(value)
+
+    @override_settings(RECIPE_IMAGE_MAX_SIZE=100)
+    def test_rejects_oversized_payload_before_decoding(self):
+        with self.assertRaisesMessage(
+            serializers.ValidationError, "Слишком большое изображение."
+        ):
+            self.decode(data_uri("*" * 200))
+
+    def test_validates_image(self):
+        field = Base64ImageField()
+        image = field.to_internal_value(
+            data_uri(base64.b64encode(PNG).decode()))
+        self.assertEqual(image.read(), PNG)
+        # Изображение проверяет поле Django, его ошибку в ответ
+        # превращает сериализатор.
+        with self.assertRaises(ValidationError):
+            field.to_internal_value(
+                data_uri(base64.b64encode(b"x" * 64).decode()))
+
+
+class RecipeImageUploadTest(FoodgramTestCase):
+    def test_saved_image_file_is_closed(self):
+        client = APIClient()
+        client.force_authenticate(create_user("author"))
+        ingredient, = create_ingredients(1)
+        unraisable = []
+        with mock.patch.object(sys, "unraisablehook", unraisable.append):
+            # Ответ держит сериализатор, а с ним и файл изображения.
+            status_code = client.post("/api/recipes/", {
+                "name": "Каша",
+                "text": "Описание",
+                "cooking_time": 10,
+                "tags": [create_tag("breakfast").pk],
+                "ingredients": [{"id": ingredient.pk, "amount": 5}],
+                "image": data_uri(base64.b64encode(PNG).decode()),
+            }, format="json").status_code
+            gc.collect()
+        self.assertEqual(status_code, 201)
+        self.assertEqual([hook.exc_type for hook in unraisable], [])
+
+
+@tag("benchmark")
+class Base64ImageFieldMemoryBenchmark(SimpleTestCase):
+    """
+    Пиковое потребление памяти при декодировании изображения
+    в сравнении с декодированием строки целиком. Строка base64
+    создаётся до замера: её держит разобранное тело JSON-запроса.
+    """
+
+    def peak(self, func, repeat=20):
+        peaks = []
+        for _ in range(repeat):
+            tracemalloc.start()
+            func()
+            peaks.append(tracemalloc.get_traced_memory()[1] / 2 ** 20)
+            tracemalloc.stop()
+        peaks.sort()
+        return peaks[len(peaks) // 2], peaks[math.ceil(len(peaks) * 0.95) - 1]
+
+    def test_peak_memory(self):
+        size = int(4 * 2 ** 20 * benchmark_scale())
+        value = data_uri(base64.b64encode(os.urandom(size)).decode())
+        field = Base64ImageField()
+
+        def chunked():
+            field.decode_base64(value).close()
+
+        def whole():
+            header, _, payload = value.partition(";base64,")
+            base64.b64decode(payload)
+
+        print(f"\nBase64ImageField, изображение {size / 2 ** 20:.1f} MiB")
+        for name, func in (("по частям во временный файл", chunked),
+                           ("строкой целиком", whole)):
+            median, p95 = self.peak(func)
+            print(f"  {name:<32} median {median:7.2f} MiB  p95 {p95:7.2f} MiB")
@@ -0,0 +1,28 @@
+from rest_framework.test import APIClient
+
+from .utils import FoodgramTestCase, create_ingredients
+
+
+class IngredientRetrieveTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ingredient, = create_ingredients(1)
+        self.client = APIClient()
+
+    def get(self, pk):
+        return self.client.get(f"/api/ingredients/{pk}/")
+
+    def test_retrieve(self):
+        response = self.get(self.ingredient.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["name"], self.ingredient.name)
+        self.assertEqual(
+            self.get(f"00{self.ingredient.pk}").json(), response.json())
+
+    def test_non_ascii_digits_are_not_found(self):
+        for pk in ("²", "١", "1²", "-1", "abc"):
+            with self.subTest(pk=pk):
+                self.assertEqual(self.get(pk).status_code, 404)
+
+    def test_missing_ingredient(self):
+        self.assertEqual(self.get(self.ingredient.pk + 1).status_code, 404)
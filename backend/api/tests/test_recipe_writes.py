@@ -0,0 +1,123 @@
+import base64
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.idempotency import prune_idempotency_keys
+from api.models import IdempotencyKey
+from recipes.models import Favorite, Recipe
+from .utils import (
+    PNG,
+    FoodgramTestCase,
+    create_ingredients,
+    create_recipe,
+    create_tag,
+    create_user)
+
+
+class RecipeETagTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.reader = create_user("reader")
+        self.recipe = create_recipe(self.author, "Каша")
+        self.url = f"/api/recipes/{self.recipe.pk}/"
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def etag(self, user):
+        return self.client_for(user).get(self.url)["ETag"]
+
+    def test_etag_differs_per_viewer_and_body(self):
+        before = self.etag(self.reader)
+        self.assertNotEqual(before, self.etag(self.author))
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        after = self.etag(self.reader)
+        self.assertNotEqual(before, after)
+        self.assertTrue(after.startswith(f'"{self.recipe.version}-'))
+
+    def test_if_match_accepts_content_etag(self):
+        client = self.client_for(self.author)
+        etag = client.get(self.url)["ETag"]
+        response = client.patch(
+            self.url, {"name": "Овсянка"}, format="json",
+            HTTP_IF_MATCH="W/" + etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["ETag"].startswith(
+            f'"{self.recipe.version + 1}-'))
+        response = client.patch(
+            self.url, {"name": "Манка"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+
+
+class IdempotencyTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user("author")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = create_tag("breakfast")
+        self.ingredient, = create_ingredients(1)
+
+    def create(self, key, name="Каша"):
+        return self.client.post("/api/recipes/", {
+            "name": name,
+            "text": "Описание",
+            "cooking_time": 10,
+            "tags": [self.tag.pk],
+            "ingredients": [{"id": self.ingredient.pk, "amount": 5}],
+            "image": "data:image/png;base64,"
+                     + base64.b64encode(PNG).decode(),
+        }, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_returns_stored_response_with_etag(self):
+        first = self.create("key-1")
+        self.assertEqual(first.status_code, 201)
+        replay = self.create("key-1")
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(replay["ETag"], first["ETag"])
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_key_reused_for_other_request(self):
+        self.create("key-1")
+        self.assertEqual(self.create("key-1", name="Суп").status_code, 422)
+
+    def test_in_progress_and_abandoned_keys(self):
+        self.create("key-1")
+        stored = IdempotencyKey.objects.get()
+        stored.status_code = None
+        stored.save()
+        self.assertEqual(self.create("key-1").status_code, 409)
+        # Запрос, занявший ключ, так и не завершился: ключ занимается
+        # заново и запрос выполняется ещё раз.
+        Recipe.objects.all().delete()
+        IdempotencyKey.objects.update(
+            created=timezone.now() - timedelta(hours=1))
+        response = self.create("key-1")
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 201)
+
+    def test_keys_are_per_user(self):
+        recipe = create_recipe(self.user, "Суп")
+        url = f"/api/recipes/{recipe.pk}/favorite/"
+        other = APIClient()
+        other.force_authenticate(create_user("reader"))
+        for client in (self.client, other):
+            response = client.post(url, HTTP_IDEMPOTENCY_KEY="same")
+            self.assertEqual(response.status_code, 201)
+            self.assertFalse(response.has_header("Idempotent-Replayed"))
+        self.assertEqual(Favorite.objects.count(), 2)
+
+    def test_prune_removes_expired_keys(self):
+        self.create("key-1")
+        self.assertEqual(prune_idempotency_keys(), 0)
+        IdempotencyKey.objects.update(
+            created=timezone.now() - timedelta(days=2))
+        self.assertEqual(prune_idempotency_keys(), 1)
@@ -0,0 +1,113 @@
+import datetime
+import io
+import uuid
+from decimal import Decimal
+
+from django.test import SimpleTestCase, override_settings, tag
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.parsers import FastJSONParser, RequestTooLarge
+from api.renderers import FastJSONRenderer
+from .utils import benchmark_scale, measure, report
+
+
+def recipe_page(size):
+    return {
+        "count": size,
+        "next": None,
+        "previous": None,
+        "results": [
+            {
+                "id": index,
+                "tags": [{"id": 1, "name": "Завтрак", "color": "#E26C2D",
+                          "slug": "breakfast"}],
+                "author": {"email": "povar@example.com", "id": 7,
+                           "username": "povar", "first_name": "Иван",
+                           "last_name": "Петров", "is_subscribed": True},
+                "ingredients": [
+                    {"id": item, "name": f"Ингредиент {item}",
+                     "measurement_unit": "г", "amount": item * 10}
+                    for item in range(10)
+                ],
+                "name": f"Рецепт №{index}",
+                "image": f"/media/food/images/{index}.png",
+                "text": "Нарезать, перемешать и запечь. " * 60,
+                "cooking_time": 45,
+                "is_favorited": False,
+                "is_in_shopping_cart": True,
+            }
+            for index in range(size)
+        ],
+    }
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    def assertSameOutput(self, data):
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_matches_json_renderer(self):
+        self.assertSameOutput(recipe_page(3))
+        self.assertSameOutput({
+            "datetime": datetime.datetime(
+                2023, 5, 1, 12, 30, 15, 123456,
+                tzinfo=datetime.timezone.utc),
+            "naive": datetime.datetime(2023, 5, 1, 12, 30),
+            "date": datetime.date(2023, 5, 1),
+            "time": datetime.time(7, 5, 3, 250000),
+            "decimal": Decimal("12.50"),
+            "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "text": "Щи да каша — пища наша    \"\\ \t",
+            "big": 2 ** 70,
+            "nested": [[], {}, None, True, 0, -1],
+        })
+
+    def test_documented_float_differences(self):
+        self.assertEqual(FastJSONRenderer().render([1.5]), b"[1.5]")
+        self.assertEqual(FastJSONRenderer().render([1e16]), b"[1e16]")
+        self.assertEqual(FastJSONRenderer().render([1e-05]), b"[0.00001]")
+        self.assertEqual(
+            FastJSONRenderer().render([float("nan")]), b"[null]")
+
+    def test_indent_falls_back_to_json_renderer(self):
+        data = {"name": "Борщ"}
+        context = {"indent": 2}
+        self.assertEqual(
+            FastJSONRenderer().render(data, renderer_context=context),
+            JSONRenderer().render(data, renderer_context=context))
+
+
+class FastJSONParserTest(SimpleTestCase):
+    def test_matches_json_parser(self):
+        body = JSONRenderer().render(recipe_page(2))
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)))
+
+    @override_settings(JSON_MAX_BODY_SIZE=10)
+    def test_rejects_large_body(self):
+        with self.assertRaises(RequestTooLarge):
+            FastJSONParser().parse(io.BytesIO('{"name": "Борщ"}'.encode()))
+
+
+@tag("benchmark")
+class RendererBenchmark(SimpleTestCase):
+    """
+    Рендеринг и разбор страниц рецептов с длинным текстом.
+    """
+
+    def test_recipe_pages(self):
+        for size in (6, 100, int(1000 * benchmark_scale())):
+            data = recipe_page(size)
+            body = JSONRenderer().render(data)
+            report(f"JSON, страница из {size} рецептов, {len(body)} байт", [
+                ("JSONRenderer",
+                 *measure(lambda: JSONRenderer().render(data))),
+                ("FastJSONRenderer",
+                 *measure(lambda: FastJSONRenderer().render(data))),
+                ("JSONParser",
+                 *measure(lambda: JSONParser().parse(io.BytesIO(body)))),
+                ("FastJSONParser",
+                 *measure(lambda: FastJSONParser().parse(io.BytesIO(body)))),
+            ])
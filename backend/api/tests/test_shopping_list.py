@@ -0,0 +1,52 @@
+import os
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+
+from recipes.models import Cart
+from .utils import FoodgramTestCase, create_recipe, create_user
+
+
+class ShoppingListRenderingTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user("buyer")
+        self.other = create_user("other")
+        author = create_user("author")
+        self.recipes = [create_recipe(author, f"recipe{index}")
+                        for index in range(5)]
+
+    def test_one_render_per_user_and_transaction(self):
+        with mock.patch("api.signals.render_shopping_list") as render, \
+                self.captureOnCommitCallbacks(execute=True):
+            for recipe in self.recipes:
+                Cart.objects.create(user=self.user, recipe=recipe)
+            Cart.objects.create(user=self.other, recipe=self.recipes[0])
+            Cart.objects.filter(user=self.user).delete()
+        self.assertCountEqual(
+            [call.args for call in render.delay.call_args_list],
+            [(self.user.id,), (self.other.id,)])
+
+    def test_recipe_delete_cascade_renders_once(self):
+        for recipe in self.recipes[:3]:
+            Cart.objects.create(user=self.user, recipe=recipe)
+        with mock.patch("api.signals.render_shopping_list") as render, \
+                self.captureOnCommitCallbacks(execute=True):
+            for recipe in self.recipes[:3]:
+                recipe.delete()
+        render.delay.assert_called_once_with(self.user.id)
+
+    def test_prune_command_removes_stale_files(self):
+        root = Path(settings.SHOPPING_LIST_ROOT)
+        root.mkdir(parents=True, exist_ok=True)
+        stale, fresh = root / "stale.pdf", root / "fresh.pdf"
+        stale.write_bytes(b"%PDF")
+        fresh.write_bytes(b"%PDF")
+        old = time.time() - settings.SHOPPING_LIST_TTL - 60
+        os.utime(stale, (old, old))
+        call_command("pruneshoppinglists", stdout=mock.MagicMock())
+        self.assertFalse(stale.exists())
+        self.assertTrue(fresh.exists())
@@ -0,0 +1,30 @@
+from rest_framework.test import APIClient
+
+from recipes.models import SimilarRecipe
+from .utils import FoodgramTestCase, create_recipe, create_user
+
+
+class SimilarRecipesTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        author = create_user("author")
+        self.recipe = create_recipe(author, "Блины")
+        self.other = create_recipe(author, "Оладьи")
+        SimilarRecipe.objects.create(
+            recipe=self.recipe, similar=self.other, score=0.5)
+        self.client = APIClient()
+
+    def get(self, pk):
+        return self.client.get(f"/api/recipes/{pk}/similar/")
+
+    def test_similar(self):
+        response = self.get(self.recipe.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe["id"] for recipe in response.json()], [self.other.pk])
+
+    def test_invalid_id_is_not_found(self):
+        self.assertEqual(self.get("abc").status_code, 404)
+
+    def test_missing_recipe_is_not_found(self):
+        self.assertEqual(self.get(self.other.pk + 1).status_code, 404)
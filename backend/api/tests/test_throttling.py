@@ -0,0 +1,80 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import DatabaseError
+from django.test import RequestFactory, TestCase, override_settings
+
+from api import throttling
+from api.models import ThrottleBucket
+from api.throttling import TokenBucketThrottle, prune_buckets
+
+
+class View:
+    throttle_scope = "test"
+
+
+@override_settings(THROTTLE_BUCKETS={"test": {"rate": 1, "burst": 2}})
+class TokenBucketThrottleTest(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get("/", REMOTE_ADDR="10.0.0.1")
+        self.request.user = AnonymousUser()
+
+    def allow(self, now=1000.0):
+        # Новый экземпляр на каждый запрос, как в DRF: состояние
+        # корзины общее только через базу данных.
+        throttle = TokenBucketThrottle()
+        with mock.patch("api.throttling.time.time", return_value=now):
+            return throttle.allow_request(self.request, View()), throttle
+
+    def test_burst_then_refused_with_wait(self):
+        self.assertTrue(self.allow()[0])
+        self.assertTrue(self.allow()[0])
+        allowed, throttle = self.allow()
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 1.0)
+        bucket = ThrottleBucket.objects.get(key="test:10.0.0.1")
+        self.assertAlmostEqual(bucket.tokens, 0)
+
+    def test_allowed_request_is_one_query(self):
+        self.allow()
+        with self.assertNumQueries(1):
+            self.assertTrue(self.allow()[0])
+
+    def test_refused_request_keeps_bucket(self):
+        self.allow()
+        self.allow()
+        self.assertFalse(self.allow(1000.5)[0])
+        bucket = ThrottleBucket.objects.get(key="test:10.0.0.1")
+        self.assertEqual((bucket.tokens, bucket.updated), (0, 1000.0))
+
+    def test_refills_with_time(self):
+        self.allow()
+        self.allow()
+        self.assertFalse(self.allow(1000.5)[0])
+        self.assertTrue(self.allow(1001.0)[0])
+
+    def test_unscoped_views_are_not_throttled(self):
+        class Unscoped:
+            pass
+
+        throttle = TokenBucketThrottle()
+        self.assertTrue(throttle.allow_request(self.request, Unscoped()))
+        self.assertFalse(ThrottleBucket.objects.exists())
+
+    def test_falls_back_to_process_memory(self):
+        throttling.local_buckets.clear()
+        with mock.patch(
+            "api.throttling.spend_token", side_effect=DatabaseError,
+        ), self.assertLogs("api.throttling", "WARNING"):
+            results = [self.allow()[0] for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        throttling.local_buckets.clear()
+
+    def test_prune_deletes_only_full_buckets(self):
+        ThrottleBucket.objects.create(key="test:idle", tokens=0, updated=0)
+        self.allow(now=1e12)
+        with mock.patch("api.throttling.time.time", return_value=1e12):
+            self.assertEqual(prune_buckets(), 1)
+        self.assertEqual(
+            list(ThrottleBucket.objects.values_list("key", flat=True)),
+            ["test:10.0.0.1"])
@@ -0,0 +1,175 @@
+import random
+from collections import defaultdict
+
+from django.test import SimpleTestCase, tag
+
+from api.shopping_list import get_shopping_list
+from recipes.models import Cart, Ingredient, IngredientForRecipe
+from recipes.units import UNCOUNTABLE_UNITS, UNITS, format_amount
+from .utils import (
+    FoodgramTestCase,
+    benchmark_scale,
+    create_recipe,
+    create_user,
+    measure,
+    report)
+
+# Единицы из data/ingredients.csv, которых нет в таблице перевода.
+OTHER_UNITS = ("шт.", "щепотка", "банка", "пучок")
+NAMES = ("Молоко", "Мука", "Соль", "Сахар", "Масло", "Яйца", "Вода")
+
+
+def reference_totals(items):
+    """
+    Суммы по (название, каноническая единица) для пар
+    (ингредиент, количество), посчитанные в Python.
+    """
+
+    totals = defaultdict(float)
+    for ingredient, amount in items:
+        unit, factor = UNITS.get(
+            ingredient.measurement_unit, (ingredient.measurement_unit, 1))
+        totals[ingredient.name, unit] += amount * factor
+    return totals
+
+
+class UnitTableTest(SimpleTestCase):
+    def test_canonical_units_are_fixed_points(self):
+        for unit, (canonical, factor) in UNITS.items():
+            with self.subTest(unit=unit):
+                self.assertEqual(UNITS[canonical][0], canonical)
+                if canonical not in UNCOUNTABLE_UNITS:
+                    self.assertEqual(UNITS[canonical][1], 1)
+                    self.assertGreater(factor, 0)
+
+    def test_format_amount_round_trips(self):
+        rng = random.Random(35)
+        for _ in range(500):
+            amount = rng.choice((
+                rng.randint(1, 100000),
+                rng.uniform(0, 10000),
+                rng.randint(1, 1000) * 0.05,
+            ))
+            text, unit = format_amount(amount, "г").rsplit(" ", 1)
+            with self.subTest(amount=amount):
+                self.assertEqual(unit, "г")
+                self.assertAlmostEqual(float(text), round(amount, 2),
+                                       places=2)
+                if "." in text:
+                    self.assertFalse(text.endswith(("0", ".")))
+
+    def test_uncountable_amount_is_not_printed(self):
+        self.assertEqual(format_amount(0, "по вкусу"), "по вкусу")
+
+
+class AggregationPropertyTest(FoodgramTestCase):
+    """
+    Свойства агрегации на случайных корзинах: суммы совпадают
+    с расчётом в Python, не зависят от порядка добавления рецептов
+    и складываются для непересекающихся корзин.
+    """
+
+    cases = 15
+
+    def setUp(self):
+        super().setUp()
+        self.author = create_user("author")
+        self.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name in NAMES
+            for unit in (*UNITS, *OTHER_UNITS)
+        ]
+        self.recipe_count = 0
+
+    def random_recipe(self, rng):
+        self.recipe_count += 1
+        items = [(ingredient, rng.randint(1, 1000))
+                 for ingredient in rng.sample(self.ingredients, 6)]
+        return create_recipe(
+            self.author, f"recipe{self.recipe_count}", ingredients=items)
+
+    def totals(self, user):
+        return {(name, unit): total
+                for name, unit, total in get_shopping_list(user.id)}
+
+    def assertTotalsEqual(self, actual, expected):
+        self.assertEqual(set(actual), set(expected))
+        for key, total in expected.items():
+            self.assertAlmostEqual(actual[key], total, places=6, msg=key)
+
+    def test_matches_reference(self):
+        rng = random.Random(2023)
+        for case in range(self.cases):
+            user = create_user(f"buyer{case}")
+            recipes = [self.random_recipe(rng)
+                       for _ in range(rng.randint(0, 5))]
+            for recipe in recipes:
+                Cart.objects.create(user=user, recipe=recipe)
+            items = [
+                (row.ingredient, row.amount)
+                for row in IngredientForRecipe.objects.filter(
+                    recipe__in=recipes).select_related("ingredient")
+            ]
+            with self.subTest(case=case):
+                self.assertTotalsEqual(
+                    self.totals(user), reference_totals(items))
+
+    def test_order_independent_and_additive(self):
+        rng = random.Random(7)
+        for case in range(self.cases):
+            recipes = [self.random_recipe(rng) for _ in range(6)]
+            first, second, union = (
+                create_user(f"{role}{case}")
+                for role in ("first", "second", "union"))
+            for recipe in recipes[:3]:
+                Cart.objects.create(user=first, recipe=recipe)
+            for recipe in recipes[3:]:
+                Cart.objects.create(user=second, recipe=recipe)
+            for recipe in rng.sample(recipes, len(recipes)):
+                Cart.objects.create(user=union, recipe=recipe)
+            combined = defaultdict(float)
+            for user in (first, second):
+                for key, total in self.totals(user).items():
+                    combined[key] += total
+            with self.subTest(case=case):
+                self.assertTotalsEqual(self.totals(union), combined)
+
+
+@tag("benchmark")
+class AggregationBenchmark(FoodgramTestCase):
+    """
+    Агрегация списка покупок из тысяч строк корзины в SQL против
+    выборки строк и подсчёта в Python.
+    """
+
+    def test_large_cart(self):
+        rng = random.Random(1)
+        author = create_user("author")
+        buyer = create_user("buyer")
+        ingredients = [
+            Ingredient.objects.create(name=f"{name} {index}",
+                                      measurement_unit=unit)
+            for index in range(20)
+            for name in NAMES
+            for unit in (*UNITS, *OTHER_UNITS)
+        ]
+        recipe_count = int(300 * benchmark_scale())
+        for index in range(recipe_count):
+            recipe = create_recipe(
+                author, f"recipe{index}", ingredients=[
+                    (ingredient, rng.randint(1, 1000))
+                    for ingredient in rng.sample(ingredients, 10)])
+            Cart.objects.create(user=buyer, recipe=recipe)
+
+        def in_python():
+            return reference_totals(
+                (row.ingredient, row.amount)
+                for row in IngredientForRecipe.objects.filter(
+                    recipe__shopping_cart__user=buyer
+                ).select_related("ingredient"))
+
+        report(f"Список покупок, {recipe_count * 10} строк корзины", [
+            ("SQL (get_shopping_list)",
+             *measure(lambda: get_shopping_list(buyer.id), repeat=10)),
+            ("Python", *measure(in_python, repeat=10)),
+        ])
@@ -0,0 +1,109 @@
+import hashlib
+import math
+import os
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from api.cards import refresh_cards
+from recipes.models import Ingredient, IngredientForRecipe, Recipe, Tag
+
+User = get_user_model()
+
+# Минимальный PNG 1x1.
+PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360606060000000050001a5f64540"
+    "0000000049454e44ae426082"
+)
+
+
+def create_user(username, **fields):
+    fields.setdefault("email", f"{username}@example.com")
+    fields.setdefault("first_name", username.capitalize())
+    fields.setdefault("last_name", username.capitalize())
+    return User.objects.create(username=username, **fields)
+
+
+def create_tag(slug, color=None):
+    return Tag.objects.create(
+        name=slug, slug=slug,
+        color=color or "#" + hashlib.md5(slug.encode()).hexdigest()[:6])
+
+
+def create_recipe(author, name, tags=(), ingredients=(), text="Описание"):
+    """
+    Рецепт с тегами tags и ингредиентами — парами (ингредиент, количество).
+    """
+
+    recipe = Recipe(author=author, name=name, text=text, cooking_time=10)
+    recipe.image.save(f"{name}.png", ContentFile(PNG), save=False)
+    recipe.save()
+    recipe.tags.set(tags)
+    IngredientForRecipe.objects.bulk_create(
+        IngredientForRecipe(
+            recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient, amount in ingredients
+    )
+    # bulk_create не шлёт сигналов, а в TestCase не выполняются
+    # обработчики on_commit: карточку перестраиваем явно.
+    refresh_cards([recipe.id])
+    return recipe
+
+
+def create_ingredients(count, unit="г"):
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f"Ингредиент {index}", measurement_unit=unit)
+        for index in range(count)
+    )
+    return list(Ingredient.objects.order_by("-id")[:count])[::-1]
+
+
+class FoodgramTestCase(TestCase):
+    """
+    Тест с очищенными кэшами: кэши, в отличие от БД,
+    не откатываются вместе с транзакцией теста.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+
+def benchmark_scale():
+    """
+    Множитель объёма данных бенчмарков (переменная BENCHMARK_SCALE).
+    """
+
+    return float(os.getenv("BENCHMARK_SCALE", 1))
+
+
+def measure(func, repeat=20):
+    """
+    Медиана и 95-й перцентиль времени вызова func в миллисекундах.
+    """
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return (statistics.median(timings),
+            timings[math.ceil(len(timings) * 0.95) - 1])
+
+
+def report(title, rows):
+    """
+    Печатает результаты бенчмарка: строки (название, медиана, p95).
+    """
+
+    print(f"\n{title}")
+    for name, median, p95 in rows:
+        print(f"  {name:<48} median {median:9.3f} ms  p95 {p95:9.3f} ms")
@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from rest_framework.throttling import BaseThrottle
+
+from .models import ThrottleBucket
+
+logger = logging.getLogger(__name__)
+
+# Используются, если база данных недоступна.
+LOCAL_MAX_BUCKETS = 10000
+local_buckets = {}
+local_lock = threading.Lock()
+
+
+def take_token(bucket, rate, burst, now):
+    """
+    Пополняет корзину за прошедшее время и забирает из неё токен.
+    Возвращает время ожидания в секундах, если токенов не хватило.
+    """
+
+    bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated) * rate)
+    bucket.updated = now
+    if bucket.tokens < 1:
+        return (1 - bucket.tokens) / rate
+    bucket.tokens -= 1
+    return None
+
+
+def spend_token(key, rate, burst, now):
+    """
+    Забирает токен из корзины ThrottleBucket одним запросом
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING: пополнение
+    и списание выполняются атомарно в базе данных, без транзакции
+    и блокировки строки. Если токенов не хватило, строка не меняется
+    и не возвращается; тогда возвращается время ожидания в секундах.
+    """
+
+    quote = connection.ops.quote_name
+    table, key_column, tokens, updated = (
+        quote(name) for name in (ThrottleBucket._meta.db_table,
+                                 "key", "tokens", "updated"))
+    available = (
+        f"{table}.{tokens} + (EXCLUDED.{updated} - {table}.{updated}) * %s")
+    refilled = f"CASE WHEN {available} > %s THEN %s ELSE {available} END"
+    sql = (
+        f"INSERT INTO {table} ({key_column}, {tokens}, {updated}) "
+        f"VALUES (%s, %s, %s) ON CONFLICT ({key_column}) DO UPDATE "
+        f"SET {tokens} = {refilled} - 1, {updated} = EXCLUDED.{updated} "
+        f"WHERE {refilled} >= 1 RETURNING {tokens}"
+    )
+    params = [key, burst - 1, now, *[rate, burst, burst, rate] * 2]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        if cursor.fetchone() is not None:
+            return None
+    bucket = ThrottleBucket.objects.filter(key=key).first()
+    if bucket is None:
+        # Корзину только что удалил prune_buckets: она была полной.
+        return None
+    return take_token(bucket, rate, burst, now)
+
+
+def prune_buckets():
+    """
+    Удаляет корзины, которые за время простоя наполнились полностью:
+    они ничем не отличаются от ещё не созданных.
+    Возвращает число удалённых корзин.
+    """
+
+    refill = max(
+        bucket["burst"] / bucket["rate"]
+        for bucket in settings.THROTTLE_BUCKETS.values()
+    )
+    deleted, _ = ThrottleBucket.objects.filter(
+        updated__lt=time.time() - refill).delete()
+    return deleted
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Ограничение частоты запросов по алгоритму token bucket.
+    Параметры корзины берутся из THROTTLE_BUCKETS по throttle_scope
+    представления: rate — токенов в секунду, burst — ёмкость корзины.
+    Корзина хранится строкой ThrottleBucket и меняется одним атомарным
+    запросом, поэтому параллельные запросы из разных воркеров
+    не расходуют один токен дважды. При недоступности базы данных
+    корзина ведётся в памяти процесса.
+    """
+
+    key_format = "{scope}:{ident}"
+
+    def __init__(self):
+        self.wait_time = None
+
+    def get_bucket_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f"user-{request.user.pk}"
+        else:
+            ident = self.get_ident(request)
+        return self.key_format.format(scope=view.throttle_scope, ident=ident)
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        if scope not in settings.THROTTLE_BUCKETS:
+            return True
+        rate = settings.THROTTLE_BUCKETS[scope]["rate"]
+        burst = settings.THROTTLE_BUCKETS[scope]["burst"]
+        key = self.get_bucket_key(request, view)
+        try:
+            self.wait_time = spend_token(key, rate, burst, time.time())
+        except DatabaseError:
+            logger.warning("Корзины ограничения запросов недоступны",
+                           exc_info=True)
+            with local_lock:
+                if len(local_buckets) >= LOCAL_MAX_BUCKETS:
+                    local_buckets.clear()
+                bucket = local_buckets.setdefault(
+                    key, ThrottleBucket(key=key, tokens=burst,
+                                        updated=time.time()))
+                self.wait_time = take_token(bucket, rate, burst, time.time())
+        return self.wait_time is None
+
+    def wait(self):
+        return self.wait_time
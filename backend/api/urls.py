@@ -1,4 +1,4 @@
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import SimpleRouter
 
 from .views import (
@@ -7,6 +7,7 @@ from .views import (
     IngredientViewSet,
     RecipeViewSet,
     TagViewSet,
+    TokenCreateView,
     UserViewSet,
 )
 
@@ -24,5 +25,6 @@ urlpatterns = [
     path("users/subscriptions/", FollowView.as_view()),
     path("users/<int:pk>/subscribe/", FollowToView.as_view()),
     path("", include(router.urls)),
+    re_path(r"^auth/token/login/?$", TokenCreateView.as_view(), name="login"),
     path("auth/", include("djoser.urls.authtoken")),
 ]
@@ -1,9 +1,27 @@
-from .filters import RecipeFilter
-from .pagination import CustomPagination
+from .filters import RecipeCardFilter, RecipeFilter, UserFilter
+from .feed import pull_heavy_authors
+from .pagination import CustomPagination, FeedPagination, UserPagination
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db.models import BooleanField, Exists, OuterRef, Sum, Value
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified)
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import Cart, Favorite, Ingredient, Recipe, Tag
+from djoser.views import TokenCreateView as DjoserTokenCreateView
+from recipes.archive import archive_carts
+from recipes.models import (
+    Cart,
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeCard,
+    SimilarRecipe,
+    Tag)
 from rest_framework import filters, status, views, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import ListAPIView
@@ -12,7 +30,14 @@ from rest_framework.response import Response
 from rest_framework.validators import ValidationError
 
 from users.models import Follow
+from .concurrency import PreconditionFailed, if_match_version, recipe_etag
+from .fast_serializers import INGREDIENT, RECIPE_PART
+from .idempotency import idempotent
+from .includes import parse_includes, represent_recipe_with_includes
+from .ingredients import cached_ingredients
+from .mixins import BoundedHashingMixin, FastListMixin
 from .permissions import AdminOrReadOnly, IsOwnerOrReadOnly
+from .relations import insert_relation
 from .serializers import (
     CustomUserPostSerializer,
     CustomUserSerializer,
@@ -21,24 +46,54 @@ from .serializers import (
     IngredientSerializer,
     PasswordSerializer,
     RecipeAddSerializer,
-    RecipePartSerializer,
+    RecipeIdsSerializer,
     RecipeSerializer,
     TagSerializer,
+    represent_cards,
+    represent_recipes,
 )
+from .shopping_list import ensure_shopping_list
+from .signals import relations_bulk_created
+from .tag_snapshot import get_tag_snapshot
 
 User = get_user_model()
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class TokenCreateView(BoundedHashingMixin, DjoserTokenCreateView):
+    """
+    Вход по паролю djoser с ограниченным ожиданием слота хеширования.
+    """
+
+
+class UserViewSet(BoundedHashingMixin, viewsets.ModelViewSet):
     """
     Кастомный Вьюсет для User.
     Реализован отлично от библиотеки djoser
     для установки пагинации.
+    Список листается курсором по id, is_subscribed вычисляется
+    подзапросом EXISTS в том же запросе.
+    Регистрация и смена пароля ждут слот хеширования ограниченное время.
     """
 
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
-    pagination_class = CustomPagination
+    pagination_class = UserPagination
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = UserFilter
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ("list", "retrieve"):
+            user = self.request.user
+            if user.is_authenticated:
+                is_subscribed = Exists(Follow.objects.filter(
+                    user=user, author=OuterRef("pk")))
+            else:
+                is_subscribed = Value(False, output_field=BooleanField())
+            queryset = queryset.only(
+                "email", "id", "username", "first_name", "last_name"
+            ).annotate(is_subscribed=is_subscribed)
+        return queryset
 
     def get_serializer_class(self):
         if self.action in ("list", "retrieve"):
@@ -49,8 +104,8 @@ class UserViewSet(viewsets.ModelViewSet):
         methods=["get"],
         detail=False, permission_classes=[IsAuthenticated])
     def me(self, request, *args, **kwargs):
-        user = get_object_or_404(User, pk=request.user.id)
-        serializer = CustomUserSerializer(user)
+        serializer = CustomUserSerializer(
+            request.user, context=self.get_serializer_context())
         return Response(serializer.data)
 
     @action(methods=["post"], detail=False)
@@ -110,6 +165,8 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet для модели Tag,
     который предоставляет только операции чтения данных.
+    Ответы строятся из снимка тегов в памяти процесса без запросов к БД;
+    список отдаётся готовым JSON с ETag по содержимому.
     """
 
     queryset = Tag.objects.all()
@@ -117,8 +174,30 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (AdminOrReadOnly,)
     pagination_class = None
 
-
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+    def list(self, request, *args, **kwargs):
+        snapshot = get_tag_snapshot()
+        if request.META.get("HTTP_IF_NONE_MATCH") in (
+                snapshot.etag, "W/" + snapshot.etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                snapshot.payload, content_type="application/json")
+        response["ETag"] = snapshot.etag
+        patch_cache_control(
+            response, public=True, max_age=settings.TAGS_MAX_AGE)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            tag = get_tag_snapshot().by_id.get(int(kwargs["pk"]))
+        except ValueError:
+            tag = None
+        if tag is None:
+            raise Http404
+        return Response(tag)
+
+
+class IngredientViewSet(FastListMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet для модели Ingredient,
     который предоставляет только операции чтения данных.
@@ -129,9 +208,39 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    fast_serializer = INGREDIENT
+    throttle_scope = "ingredient_search"
     filter_backends = [CustomSearchFilter]
     search_fields = ("^name",)
 
+    def list(self, request, *args, **kwargs):
+        def search():
+            return super(IngredientViewSet, self).list(
+                request, *args, **kwargs).data
+
+        name = request.query_params.get(
+            self.CustomSearchFilter.search_param, "")
+        return Response(
+            cached_ingredients("search", name.strip().lower(), search))
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs["pk"]
+        # isdigit() пропускает и надстрочные цифры вроде "²",
+        # на которых int() падает.
+        if not (pk.isascii() and pk.isdecimal()):
+            raise Http404
+        pk = str(int(pk))
+
+        def load():
+            row = self.get_queryset().filter(pk=pk).values(
+                *self.fast_serializer.fields).first()
+            return row and self.fast_serializer.to_representation(row)
+
+        ingredient = cached_ingredients("id", pk, load)
+        if ingredient is None:
+            raise Http404
+        return Response(ingredient)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """
@@ -142,22 +251,89 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsOwnerOrReadOnly,)
     pagination_class = CustomPagination
     filter_backends = (DjangoFilterBackend,)
-    filterset_class = RecipeFilter
     serializer_class = RecipeSerializer
+    throttle_scope = "recipe_write"
+
+    def get_throttles(self):
+        if self.action in ("create", "update", "partial_update"):
+            return super().get_throttles()
+        return []
+
+    @property
+    def filterset_class(self):
+        if self.action == "list":
+            return RecipeCardFilter
+        return RecipeFilter
+
+    def get_queryset(self):
+        if self.action == "list":
+            # Список читается из карточек рецептов одной таблицей.
+            return RecipeCard.objects.only("recipe_id", "data")
+        queryset = super().get_queryset()
+        if self.action == "retrieve":
+            # Представление собирается из кэшированных фрагментов.
+            return queryset.only("id", "author_id", "version")
+        if self.action == "similar":
+            return queryset.only("id")
+        return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        includes = parse_includes(request)
+        recipe = self.get_object()
+        if includes:
+            data = represent_recipe_with_includes(recipe, includes, request)
+        else:
+            data = self.get_serializer(recipe).data
+        return Response(data, headers={
+            "ETag": recipe_etag(recipe.version, data, request.user)})
+
+    def list(self, request, *args, **kwargs):
+        cards = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset()))
+        return self.get_paginated_response(represent_cards(cards, request))
 
     def get_serializer_class(self):
         if self.action in ("list", "retrieve"):
             return RecipeSerializer
         return RecipeAddSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ("update", "partial_update"):
+            version = if_match_version(self.request)
+            if version is not None:
+                context["expected_version"] = version
+        return context
+
+    def with_etag(self, response):
+        response["ETag"] = recipe_etag(
+            self.written.version, response.data, self.request.user)
+        return response
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return self.with_etag(super().create(request, *args, **kwargs))
+
+    def update(self, request, *args, **kwargs):
+        return self.with_etag(super().update(request, *args, **kwargs))
+
     def perform_create(self, serializer):
-        user = self.request.user
-        serializer.save(author=user)
+        self.written = serializer.save(author=self.request.user)
+
+    def perform_update(self, serializer):
+        self.written = serializer.save()
+
+    def perform_destroy(self, instance):
+        version = if_match_version(self.request)
+        if version is not None and version != instance.version:
+            raise PreconditionFailed
+        instance.delete()
 
     @action(
         detail=True, methods=("post", "delete"),
         permission_classes=(IsAuthenticated,)
     )
+    @idempotent
     def favorite(self, request, pk=None):
         if request.method == "POST":
             return self.add_recipe(Favorite, request, pk)
@@ -168,25 +344,147 @@ class RecipeViewSet(viewsets.ModelViewSet):
         detail=True, methods=("post", "delete"),
         permission_classes=(IsAuthenticated,)
     )
+    @idempotent
     def shopping_cart(self, request, pk):
         if request.method == "POST":
             return self.add_recipe(Cart, request, pk)
         else:
             return self.delete_recipe(Cart, request, pk)
 
+    @action(
+        detail=False, methods=("post", "delete"), url_path="favorite/batch",
+        permission_classes=(IsAuthenticated,)
+    )
+    @idempotent
+    def favorite_batch(self, request):
+        return self.batch_recipes(Favorite, request)
+
+    @action(
+        detail=False, methods=("post", "delete"),
+        url_path="shopping_cart/batch",
+        permission_classes=(IsAuthenticated,)
+    )
+    @idempotent
+    def shopping_cart_batch(self, request):
+        return self.batch_recipes(Cart, request)
+
+    @action(
+        detail=False, methods=("delete",), url_path="shopping_cart",
+        permission_classes=(IsAuthenticated,)
+    )
+    def clear_shopping_cart(self, request):
+        """
+        Очищает список покупок, перенося его строки в архив.
+        """
+
+        archive_carts(Cart.objects.filter(user=request.user))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def batch_recipes(self, model, request):
+        """
+        Добавляет или удаляет сразу несколько рецептов и возвращает
+        результат для каждого id.
+        """
+
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(serializer.validated_data["recipes"]))
+        user = request.user
+        found = set(Recipe.objects.filter(pk__in=recipe_ids).values_list(
+            "id", flat=True))
+        existing = set(model.objects.filter(
+            user=user, recipe_id__in=found
+        ).values_list("recipe_id", flat=True))
+        if request.method == "POST":
+            created = [pk for pk in recipe_ids
+                       if pk in found and pk not in existing]
+            model.objects.bulk_create(
+                [model(user=user, recipe_id=pk) for pk in created],
+                ignore_conflicts=True,
+            )
+            relations_bulk_created(model, user.id, created)
+            done, skipped = "added", "already_added"
+        else:
+            model.objects.filter(user=user, recipe_id__in=existing).delete()
+            done, skipped = "deleted", "not_added"
+        results = []
+        for pk in recipe_ids:
+            if pk not in found:
+                result = "not_found"
+            elif (pk in existing) == (request.method == "POST"):
+                result = skipped
+            else:
+                result = done
+            results.append({"id": pk, "status": result})
+        return Response({"results": results})
+
+    @action(detail=False, permission_classes=(IsAuthenticated,))
+    def download_shopping_cart(self, request):
+        path = ensure_shopping_list(request.user.id)
+        if settings.SHOPPING_LIST_ACCEL_PREFIX:
+            # Файл отдаёт nginx из internal-локации.
+            response = HttpResponse(content_type="application/pdf")
+            response["X-Accel-Redirect"] = (
+                settings.SHOPPING_LIST_ACCEL_PREFIX + path.name)
+        else:
+            response = FileResponse(
+                open(path, "rb"), content_type="application/pdf")
+        response["Content-Disposition"] = (
+            'attachment; filename="shopping_list.pdf"')
+        return response
+
     @action(detail=False, permission_classes=(IsAuthenticated,))
     def add_recipe(self, model, request, pk):
-        recipe = get_object_or_404(Recipe, pk=pk)
+        recipe = get_object_or_404(
+            Recipe.objects.only(*RECIPE_PART.fields), pk=pk)
         user = self.request.user
-        if model.objects.filter(recipe=recipe, user=user).exists():
+        if not insert_relation(model, user.id, recipe.id):
             raise ValidationError("Already added.")
-        model.objects.create(recipe=recipe, user=user)
-        serializer = RecipePartSerializer(recipe)
-        return Response(data=serializer.data, status=status.HTTP_201_CREATED)
+        relations_bulk_created(model, user.id, [recipe.id])
+        return Response(
+            data=RECIPE_PART.to_representation(recipe),
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(
+        detail=False, permission_classes=(IsAuthenticated,),
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        pull_heavy_authors(request.user)
+        entries = self.paginate_queryset(
+            request.user.feed.only("recipe_id", "pub_date"))
+        return self.get_paginated_response(self.represent_ids(
+            [entry.recipe_id for entry in entries], request))
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        recipe = self.get_object()
+        similar_ids = recipe.similar.values_list(
+            "similar_id", flat=True)[:settings.SIMILAR_RECIPES_TOP_K]
+        return Response(self.represent_ids(list(similar_ids), request))
+
+    @action(detail=False, permission_classes=(IsAuthenticated,))
+    def recommended(self, request):
+        favorites = request.user.favorites.values("recipe_id")
+        recommended_ids = (
+            SimilarRecipe.objects.filter(recipe_id__in=favorites)
+            .exclude(similar_id__in=favorites)
+            .values("similar_id")
+            .annotate(total=Sum("score"))
+            .order_by("-total")
+            .values_list("similar_id", flat=True)
+        )[:settings.SIMILAR_RECIPES_TOP_K]
+        return Response(self.represent_ids(list(recommended_ids), request))
+
+    def represent_ids(self, recipe_ids, request):
+        recipes = Recipe.objects.only("id", "author_id").in_bulk(recipe_ids)
+        return represent_recipes(
+            [recipes[pk] for pk in recipe_ids if pk in recipes], request)
 
     def delete_recipe(self, model, request, pk):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = self.request.user
-        obj = get_object_or_404(model, recipe=recipe, user=user)
-        obj.delete()
+        deleted, _ = model.objects.filter(
+            recipe_id=pk, user=self.request.user).delete()
+        if not deleted:
+            raise Http404
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,31 @@
+from django.db.models import Q
+from django.db.models.functions import Collate, Lower
+
+
+class IndexedSearchMixin:
+    """
+    Поиск в админке по функциональным индексам Collate(Lower(поле), "C").
+    Стандартный поиск сравнивает UPPER(поле) через LIKE, и такие
+    индексы не используются. Здесь поля search_fields с префиксом ^
+    ищутся по началу значения, с префиксом = — по точному совпадению,
+    оба без учёта регистра и тем же выражением, что в индексе.
+    Строка поиска не делится на слова: она целиком сравнивается
+    с началом или со всем значением поля.
+    """
+
+    search_lookups = {"^": "startswith", "=": "exact"}
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip().lower()
+        if not term:
+            return queryset, False
+        keys, condition = {}, Q()
+        for index, field in enumerate(self.get_search_fields(request)):
+            lookup = self.search_lookups.get(field[0])
+            if lookup is None:
+                raise ValueError(
+                    f"Поле поиска {field} должно начинаться с ^ или =.")
+            key = f"search_key_{index}"
+            keys[key] = Collate(Lower(field[1:]), "C")
+            condition |= Q(**{f"{key}__{lookup}": term})
+        return queryset.alias(**keys).filter(condition), False
@@ -0,0 +1,105 @@
+import fcntl
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+local = threading.local()
+
+
+class HashingBusy(Exception):
+    """
+    Слот хеширования не освободился за время, отведённое
+    в hashing_timeout.
+    """
+
+
+@contextmanager
+def hashing_timeout(timeout):
+    """
+    Ограничивает ожидание слота хеширования внутри блока: по истечении
+    timeout секунд hashing_slot бросает HashingBusy. Вне такого блока
+    (вход в админку, createsuperuser, changepassword) слот ждут
+    без ограничения.
+    """
+
+    previous = getattr(local, "timeout", None)
+    local.timeout = timeout
+    try:
+        yield
+    finally:
+        local.timeout = previous
+
+
+@contextmanager
+def hashing_slot():
+    """
+    Занимает один из PASSWORD_HASHING_SLOTS слотов хеширования паролей,
+    общих для всех процессов на машине. Слоты — файловые блокировки,
+    поэтому ограничение действует и между воркерами gunicorn.
+    Повторный вход из того же потока (verify вызывает encode)
+    слот не занимает.
+    """
+
+    slots = settings.PASSWORD_HASHING_SLOTS
+    if not slots or getattr(local, "held", False):
+        yield
+        return
+    os.makedirs(settings.PASSWORD_HASHING_LOCK_DIR, exist_ok=True)
+    timeout = getattr(local, "timeout", None)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        for slot in range(slots):
+            fd = os.open(
+                os.path.join(settings.PASSWORD_HASHING_LOCK_DIR,
+                             f"slot-{slot}.lock"),
+                os.O_RDWR | os.O_CREAT)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            local.held = True
+            try:
+                yield
+            finally:
+                local.held = False
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+            return
+        if deadline is not None and time.monotonic() >= deadline:
+            raise HashingBusy
+        time.sleep(0.01)
+
+
+class BoundedHasherMixin:
+    """
+    Выполняет хеширование и проверку пароля внутри слота хеширования.
+    """
+
+    def encode(self, *args, **kwargs):
+        with hashing_slot():
+            return super().encode(*args, **kwargs)
+
+    def verify(self, *args, **kwargs):
+        with hashing_slot():
+            return super().verify(*args, **kwargs)
+
+
+class Argon2PasswordHasher(BoundedHasherMixin, hashers.Argon2PasswordHasher):
+    time_cost = settings.ARGON2_TIME_COST
+    memory_cost = settings.ARGON2_MEMORY_COST
+    parallelism = settings.ARGON2_PARALLELISM
+
+
+class BCryptSHA256PasswordHasher(
+    BoundedHasherMixin, hashers.BCryptSHA256PasswordHasher
+):
+    rounds = settings.BCRYPT_ROUNDS
+
+
+class PBKDF2PasswordHasher(BoundedHasherMixin, hashers.PBKDF2PasswordHasher):
+    iterations = settings.PBKDF2_ITERATIONS
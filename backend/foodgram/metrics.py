@@ -0,0 +1,284 @@
+import atexit
+import fcntl
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+
+# Имя метрики -> (тип, описание).
+METRICS = {
+    "http_request_duration_seconds": (
+        "histogram", "Время обработки запроса по маршруту и статусу."),
+    "db_queries_total": (
+        "counter", "Число SQL-запросов по маршруту."),
+    "db_query_duration_seconds_total": (
+        "counter", "Суммарное время SQL-запросов по маршруту."),
+    "serialization_duration_seconds": (
+        "histogram", "Время сериализации ответа."),
+    "cache_requests_total": (
+        "counter", "Обращения к кэшам по результату hit/miss."),
+}
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Файл с суммой значений завершившихся процессов.
+MERGED_FILE = "merged.json"
+
+
+class Registry:
+    """
+    Счётчики и гистограммы процесса. Каждый процесс периодически
+    сбрасывает свои значения в отдельный файл METRICS_ROOT, а /metrics
+    складывает файлы всех процессов, так что воркеры gunicorn
+    не делят между собой память и блокировки.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.flushed_at = 0.0
+        self.filename = f"{os.getpid()}-{time.time_ns()}.json"
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] += value
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [
+                    [0] * len(BUCKETS), 0.0, 0]
+            for index, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram[0][index] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return to_snapshot(self.counters, self.histograms)
+
+    def flush(self):
+        root = Path(settings.METRICS_ROOT)
+        root.mkdir(parents=True, exist_ok=True)
+        write_json(root / self.filename, self.snapshot())
+        self.flushed_at = time.monotonic()
+
+    def maybe_flush(self):
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if time.monotonic() - self.flushed_at > interval:
+            self.flush()
+
+
+registry = Registry()
+# Приложение загружается в мастере gunicorn до fork: воркер начинает
+# с пустыми значениями и пишет их в собственный файл.
+os.register_at_fork(after_in_child=registry.reset)
+
+
+@atexit.register
+def flush_on_exit():
+    if settings.METRICS_ENABLED and registry.flushed_at:
+        registry.flush()
+
+
+def inc(name, value=1, **labels):
+    if settings.METRICS_ENABLED:
+        registry.inc(name, labels, value)
+
+
+def observe(name, value, **labels):
+    if settings.METRICS_ENABLED:
+        registry.observe(name, labels, value)
+
+
+@contextmanager
+def timed(name, **labels):
+    if not settings.METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(name, labels, time.perf_counter() - start)
+
+
+def cache_result(cache, hits, misses):
+    """
+    Учитывает попадания и промахи кэша cache.
+    """
+
+    if hits:
+        inc("cache_requests_total", hits, cache=cache, result="hit")
+    if misses:
+        inc("cache_requests_total", misses, cache=cache, result="miss")
+
+
+def write_json(path, data):
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as tmp:
+        json.dump(data, tmp)
+    os.replace(tmp_name, path)
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def add_snapshot(counters, histograms, data):
+    """
+    Прибавляет значения снимка data к counters и histograms.
+    """
+
+    for name, labels, value in data["counters"]:
+        counters[name, tuple(map(tuple, labels))] += value
+    for name, labels, buckets, total, count in data["histograms"]:
+        key = (name, tuple(map(tuple, labels)))
+        merged = histograms.setdefault(key, [[0] * len(BUCKETS), 0.0, 0])
+        merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+        merged[1] += total
+        merged[2] += count
+
+
+def read_snapshot(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def collect():
+    """
+    Складывает значения всех процессов из файлов METRICS_ROOT.
+    Файлы завершившихся процессов при этом сливаются в MERGED_FILE
+    и удаляются, поэтому файлов не больше, чем живых процессов,
+    а счётчики не уменьшаются после перезапуска воркеров.
+    """
+
+    root = Path(settings.METRICS_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / "collect.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        counters = defaultdict(float)
+        histograms = {}
+        merged = read_snapshot(root / MERGED_FILE)
+        if merged:
+            add_snapshot(counters, histograms, merged)
+        live, dead = [], []
+        for path in root.glob("*-*.json"):
+            data = read_snapshot(path)
+            if data is None:
+                continue
+            if is_alive(int(path.name.split("-", 1)[0])):
+                live.append(data)
+            else:
+                add_snapshot(counters, histograms, data)
+                dead.append(path)
+        if dead:
+            # Сначала сохраняется сумма, затем удаляются слитые файлы.
+            write_json(root / MERGED_FILE, to_snapshot(counters, histograms))
+            for path in dead:
+                path.unlink(missing_ok=True)
+        for data in live:
+            add_snapshot(counters, histograms, data)
+    return counters, histograms
+
+
+def to_snapshot(counters, histograms):
+    return {
+        "counters": [
+            [name, labels, value]
+            for (name, labels), value in counters.items()
+        ],
+        "histograms": [
+            [name, labels, list(buckets), total, count]
+            for (name, labels), (buckets, total, count) in histograms.items()
+        ],
+    }
+
+
+def format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(
+        '{}="{}"'.format(
+            key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in pairs
+    ) + "}"
+
+
+def render():
+    """
+    Метрики всех процессов в текстовом формате Prometheus.
+    """
+
+    registry.flush()
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f"{name}{format_labels(labels)} {value}")
+        for (metric, labels), (buckets, total, count) in sorted(
+            histograms.items()
+        ):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, buckets):
+                cumulative += bucket
+                lines.append(
+                    f"{name}_bucket{format_labels(labels, le=bound)} "
+                    f"{cumulative}")
+            lines.append(
+                f"{name}_bucket{format_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{name}_sum{format_labels(labels)} {total}")
+            lines.append(f"{name}_count{format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics_allowed(request):
+    """
+    Метрики видны адресам из METRICS_ALLOWED_IPS и запросам
+    с токеном METRICS_TOKEN в заголовке Authorization.
+    """
+
+    if request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    return bool(token) and hmac.compare_digest(
+        header.encode(), f"Bearer {token}".encode())
+
+
+def metrics_view(request):
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    if not metrics_allowed(request):
+        raise PermissionDenied
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4")
@@ -0,0 +1,259 @@
+import cProfile
+import gzip
+import hashlib
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .metrics import cache_result, inc, observe, registry
+from .profiling import save_profile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def parse_accept_encoding(header):
+    """
+    Возвращает множество кодировок с ненулевым q из Accept-Encoding.
+    """
+
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def compress(content, encoding):
+    if encoding == "br":
+        return brotli.compress(content, quality=settings.BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=settings.GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы brotli или gzip в зависимости от Accept-Encoding.
+    Не трогает потоковые, уже сжатые, несжимаемые и слишком короткие
+    ответы; сжатые тела ответов с ETag кэшируются по хешу тела.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or not response.get("Content-Type", "").startswith(
+                COMPRESSIBLE_TYPES)
+        ):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        accepted = parse_accept_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if brotli is not None and "br" in accepted:
+            encoding = "br"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            return response
+
+        etag = response.get("ETag")
+        if etag:
+            # Ключ — хеш самого тела: ETag может не различать ответы
+            # разным пользователям на один и тот же адрес.
+            key = "compressed:{}:{}".format(
+                encoding, hashlib.sha256(response.content).hexdigest())
+            content = cache.get(key)
+            cache_result("compression", content is not None, content is None)
+            if content is None:
+                content = compress(response.content, encoding)
+                cache.set(key, content, settings.COMPRESSION_CACHE_TIMEOUT)
+        else:
+            content = compress(response.content, encoding)
+        if len(content) >= len(response.content):
+            return response
+
+        response.content = content
+        response.headers["Content-Length"] = str(len(content))
+        response.headers["Content-Encoding"] = encoding
+        # Сжатое тело отличается от исходного: строгий ETag становится слабым.
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        return response
+
+
+class LoadSheddingMiddleware:
+    """
+    Сбрасывает часть нагрузки при перегрузке: если запрос ждал в очереди
+    дольше LOAD_SHEDDING_QUEUE_LATENCY секунд (по заголовку
+    X-Request-Start от nginx), то пишущие запросы и запросы
+    к LOAD_SHEDDING_PATHS получают 503, а остальное чтение продолжает
+    обслуживаться. Время ожидания в очереди отражает загрузку всех
+    воркеров сразу, в отличие от числа запросов в одном процессе:
+    синхронный воркер gunicorn выполняет их по одному.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def queue_latency(self, request):
+        start = request.META.get("HTTP_X_REQUEST_START", "")
+        try:
+            return time.time() - float(start.lstrip("t="))
+        except ValueError:
+            return 0
+
+    def is_sheddable(self, request):
+        return request.method not in ("GET", "HEAD", "OPTIONS") or (
+            request.path.startswith(settings.LOAD_SHEDDING_PATHS))
+
+    def __call__(self, request):
+        if self.is_sheddable(request) and (
+            self.queue_latency(request) > settings.LOAD_SHEDDING_QUEUE_LATENCY
+        ):
+            response = JsonResponse(
+                {"errors": "Сервер перегружен, повторите запрос позже."},
+                status=503,
+            )
+            response["Retry-After"] = str(settings.LOAD_SHEDDING_RETRY_AFTER)
+            return response
+        return self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """
+    Снимает профиль cProfile всего запроса, если сотрудник прислал
+    заголовок X-Profile или запрос попал в выборку
+    PROFILING_SAMPLE_RATE. Автор запроса с заголовком проверяется
+    аутентификацией DRF до запуска профилировщика, поэтому запросы
+    остальных пользователей не занимают профилировщик и не вытесняют
+    профили сотрудников и выборки.
+    При PROFILING_ENABLED = False middleware исключается из цепочки.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        # cProfile не допускает двух активных профилировщиков сразу.
+        self.lock = threading.Lock()
+
+    def requested_by_staff(self, request):
+        """
+        Прислал ли заголовок X-Profile сотрудник. Пользователь
+        определяется теми же классами аутентификации, что и в API.
+        """
+
+        if "HTTP_X_PROFILE" not in request.META:
+            return False
+        drf_request = Request(request, authenticators=[
+            authenticator()
+            for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ])
+        try:
+            return drf_request.user.is_staff
+        except APIException:
+            return False
+
+    def __call__(self, request):
+        requested = self.requested_by_staff(request)
+        sampled = random.random() < settings.PROFILING_SAMPLE_RATE
+        if not (requested or sampled) or not self.lock.acquire(False):
+            return self.get_response(request)
+        try:
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            response = profiler.runcall(self.get_response, request)
+            duration = time.perf_counter() - start
+            name = save_profile(profiler, self.describe(
+                request, response, duration))
+            if requested:
+                response["X-Profile-Name"] = name
+            return response
+        finally:
+            self.lock.release()
+
+    def describe(self, request, response, duration):
+        match = request.resolver_match
+        route = match.route if match else request.path
+        return {
+            "fingerprint": hashlib.md5(
+                f"{request.method} {route}".encode()).hexdigest()[:8],
+            "method": request.method,
+            "route": route,
+            "path": request.get_full_path(),
+            "status": response.status_code,
+            "duration": round(duration, 4),
+            "user": getattr(request.user, "pk", None),
+        }
+
+
+class MetricsMiddleware:
+    """
+    Учитывает время обработки запроса, число и время SQL-запросов
+    по имени маршрута. Значения копятся в реестре процесса и
+    периодически сбрасываются на диск для /metrics.
+    При METRICS_ENABLED = False middleware исключается из цепочки.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0, 0.0]
+
+        def record_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(record_query):
+            response = self.get_response(request)
+        match = request.resolver_match
+        route = match.view_name if match else "unmatched"
+        observe(
+            "http_request_duration_seconds", time.perf_counter() - start,
+            route=route, method=request.method, status=response.status_code)
+        inc("db_queries_total", queries[0], route=route)
+        inc("db_query_duration_seconds_total", queries[1], route=route)
+        registry.maybe_flush()
+        return response
@@ -0,0 +1,33 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для больших таблиц: для нефильтрованного списка на
+    PostgreSQL берёт оценку числа строк из статистики планировщика
+    вместо полного COUNT(*). У секционированной таблицы своей оценки
+    нет (reltuples равно 0 или -1), поэтому оценки суммируются
+    по таблице и её секциям.
+    """
+
+    estimate_threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == "postgresql" and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT SUM(GREATEST(reltuples, 0)) FROM pg_class "
+                    "WHERE oid = %s::regclass OR oid IN ("
+                    "SELECT inhrelid FROM pg_inherits "
+                    "WHERE inhparent = %s::regclass)",
+                    [queryset.model._meta.db_table] * 2,
+                )
+                row = cursor.fetchone()
+            if row[0] and row[0] > self.estimate_threshold:
+                return int(row[0])
+        return super().count
@@ -0,0 +1,49 @@
+import json
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+
+def profile_path(name):
+    return Path(settings.PROFILING_ROOT) / f"{name}.prof"
+
+
+def save_profile(profiler, meta):
+    """
+    Сохраняет профиль и его описание в кольцевой буфер на диске:
+    после записи остаются только PROFILING_MAX_FILES последних профилей.
+    Имя профиля — время записи и отпечаток запроса.
+    """
+
+    root = Path(settings.PROFILING_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    name = f"{time.time_ns()}-{meta['fingerprint']}"
+    profiler.dump_stats(profile_path(name))
+    (root / f"{name}.json").write_text(json.dumps(meta, ensure_ascii=False))
+    for stale in list_profiles()[settings.PROFILING_MAX_FILES:]:
+        profile_path(stale["name"]).unlink(missing_ok=True)
+        (root / f"{stale['name']}.json").unlink(missing_ok=True)
+    return name
+
+
+def list_profiles():
+    """
+    Описания сохранённых профилей, новые первыми.
+    """
+
+    root = Path(settings.PROFILING_ROOT)
+    if not root.exists():
+        return []
+    profiles = []
+    for entry in sorted(os.listdir(root), reverse=True):
+        if not entry.endswith(".json"):
+            continue
+        try:
+            meta = json.loads((root / entry).read_text())
+        except (OSError, ValueError):
+            continue
+        meta["name"] = entry[:-len(".json")]
+        profiles.append(meta)
+    return profiles
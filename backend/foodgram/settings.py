@@ -32,11 +32,16 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'recipes.apps.RecipesConfig',
     'api.apps.ApiConfig',
+    'taskqueue.apps.TaskqueueConfig',
     'djoser',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.middleware.MetricsMiddleware',
+    'foodgram.middleware.CompressionMiddleware',
+    'foodgram.middleware.ProfilingMiddleware',
+    'foodgram.middleware.LoadSheddingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -53,6 +58,21 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
+
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.TokenBucketThrottle',
+    ],
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -75,6 +95,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+TEST_RUNNER = 'foodgram.test_runner.TestRunner'
+
 
 ADMIN_SITE_HEADER = '-пусто-'
 
@@ -93,6 +115,169 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', '/var/tmp/foodgram_cache'),
+    },
+    # Двухуровневый кэш API: LRU в памяти процесса перед кэшем default.
+    # LOCAL_TIMEOUT — сколько секунд процесс может не видеть изменений,
+    # сделанных другими процессами.
+    'api': {
+        'BACKEND': 'api.cache.TieredCache',
+        'LOCATION': 'api',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {
+            'SHARED': 'default',
+            'LOCAL_TIMEOUT': 5,
+            'MAX_ENTRIES': 5000,
+            'MAX_BYTES': 32 * 1024 * 1024,
+            'NEGATIVE_TIMEOUT': 30,
+            'LOCK_TIMEOUT': 10,
+        },
+    },
+}
+
+# Сжатие ответов: минимальный размер тела в байтах, уровни сжатия
+# и время хранения сжатых тел ответов с ETag.
+COMPRESSION_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSION_CACHE_TIMEOUT = 60 * 60
+
+# Кэш отрисованных фрагментов рецептов.
+RECIPE_FRAGMENT_CACHE = 'default'
+RECIPE_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+# Кэш справочника ингредиентов: результатов поиска и ингредиентов по id.
+INGREDIENT_CACHE = 'api'
+INGREDIENT_CACHE_TIMEOUT = 60 * 10
+
+# Снимок тегов в памяти процесса: период сверки поколения в секундах
+# и время клиентского кэширования списка тегов.
+TAGS_SNAPSHOT_CHECK_INTERVAL = 5
+TAGS_MAX_AGE = 60 * 60
+
+# Лента подписок: авторы с числом подписчиков больше FEED_FANOUT_LIMIT
+# не раскладываются при записи, подписчики забирают их рецепты при чтении.
+FEED_FANOUT_LIMIT = 10000
+FEED_BATCH_SIZE = 1000
+FEED_BACKFILL_SIZE = 100
+FEED_PULL_INTERVAL = 60
+
+# Сколько похожих рецептов хранится и отдаётся для каждого рецепта.
+SIMILAR_RECIPES_TOP_K = 20
+
+# Сколько рецептов в каждом связанном списке ответа
+# GET /api/recipes/{id}/?include=author_recipes,similar.
+RECIPE_INCLUDE_LIMIT = 6
+
+# Очередь фоновых задач. При TASKS_EAGER задачи выполняются сразу,
+# без очереди (для тестов и локального запуска без воркера).
+TASKS_EAGER = os.getenv('TASKS_EAGER', 'False') == 'True'
+TASKS_POLL_INTERVAL = 1
+TASKS_LEASE = 10 * 60
+TASKS_RETRY_DELAY = 10
+
+# Список покупок в PDF: каталог готовых файлов, время их хранения,
+# шрифт с кириллицей и префикс internal-локации nginx для X-Accel-Redirect
+# (пустой префикс — файл отдаёт сам Django).
+SHOPPING_LIST_ROOT = os.getenv('SHOPPING_LIST_ROOT', '/shopping_lists')
+SHOPPING_LIST_TTL = 60 * 60 * 24 * 7
+SHOPPING_LIST_FONT = os.getenv(
+    'SHOPPING_LIST_FONT', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+SHOPPING_LIST_ACCEL_PREFIX = os.getenv('SHOPPING_LIST_ACCEL_PREFIX', '')
+
+# Наибольшее число рецептов в одном пакетном запросе.
+RECIPES_BATCH_MAX_SIZE = 100
+
+# Ограничение частоты запросов (token bucket) по throttle_scope:
+# rate — токенов в секунду, burst — ёмкость корзины.
+THROTTLE_BUCKETS = {
+    'ingredient_search': {'rate': 5, 'burst': 20},
+    'recipe_write': {'rate': 0.2, 'burst': 5},
+}
+
+# Сброс нагрузки при перегрузке: по времени ожидания запроса в очереди.
+LOAD_SHEDDING_QUEUE_LATENCY = 2
+LOAD_SHEDDING_RETRY_AFTER = 5
+LOAD_SHEDDING_PATHS = ('/api/ingredients/',)
+
+# Ограничения на загрузку изображений рецептов и размер JSON-запросов
+# (изображение в base64 примерно на треть длиннее исходного файла).
+RECIPE_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+JSON_MAX_BODY_SIZE = 15 * 1024 * 1024
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+
+# Жизненный цикл списков покупок: строки старше CART_ARCHIVE_AFTER_DAYS
+# переносятся в архив командой archivecarts пачками по
+# CART_ARCHIVE_BATCH_SIZE; RELATION_PARTITIONS — число хеш-секций
+# таблиц избранного и корзины (команда partitionrelations).
+CART_ARCHIVE_AFTER_DAYS = 30
+CART_ARCHIVE_BATCH_SIZE = 1000
+RELATION_PARTITIONS = 16
+
+# Хеширование паролей. Первый алгоритм в списке используется для новых
+# паролей; хеши прочих алгоритмов и хеши с другой стоимостью
+# пересчитываются при следующем входе пользователя.
+PASSWORD_HASHER_ORDER = {
+    'argon2': 'foodgram.hashers.Argon2PasswordHasher',
+    'bcrypt': 'foodgram.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'foodgram.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'argon2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_ORDER[PASSWORD_HASHER]] + [
+    hasher for name, hasher in PASSWORD_HASHER_ORDER.items()
+    if name != PASSWORD_HASHER
+]
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', 64 * 1024))
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', 1))
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+PBKDF2_ITERATIONS = int(os.getenv('PBKDF2_ITERATIONS', 260000))
+
+# Одновременных хеширований паролей на машину (0 — без ограничения),
+# сколько вход и регистрация через API ждут свободного слота до ответа
+# 503 и где хранить файлы блокировок.
+PASSWORD_HASHING_SLOTS = int(os.getenv(
+    'PASSWORD_HASHING_SLOTS', max(1, (os.cpu_count() or 2) // 2)))
+PASSWORD_HASHING_TIMEOUT = 5
+PASSWORD_HASHING_LOCK_DIR = os.getenv(
+    'PASSWORD_HASHING_LOCK_DIR', '/var/tmp/foodgram_hashing')
+
+# Профилирование запросов: включение, доля профилируемых запросов
+# (0 — только по заголовку X-Profile от сотрудника), каталог
+# и размер кольцевого буфера профилей.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '') == 'True'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_ROOT = os.getenv('PROFILING_ROOT', '/var/tmp/foodgram_profiles')
+PROFILING_MAX_FILES = 200
+
+# Метрики в формате Prometheus на /metrics: каталог файлов процессов
+# и период их записи в секундах. Метрики отдаются только адресам
+# из METRICS_ALLOWED_IPS (REMOTE_ADDR, без учёта X-Forwarded-For)
+# и запросам с заголовком Authorization: Bearer <METRICS_TOKEN>.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_ROOT = os.getenv('METRICS_ROOT', '/var/tmp/foodgram_metrics')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = [
+    ip for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+    if ip
+]
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Модули, которые должны загружаться только при первом использовании
+# (команда importtime).
+LAZY_IMPORTS = (
+    'argon2', 'bcrypt', 'PIL', 'reportlab', 'social_core', 'social_django',
+    'webcolors',
+)
+
+# Idempotency-Key: время хранения ответов и время, на которое ключ
+# занимается выполняющимся запросом.
+IDEMPOTENCY_TTL = 60 * 60 * 24
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
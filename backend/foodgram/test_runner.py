@@ -0,0 +1,51 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+BENCHMARK_TAG = "benchmark"
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Запускает тесты в изолированном окружении: кэши в памяти,
+    фоновые задачи выполняются сразу, файлы пишутся во временный
+    каталог. Бенчмарки помечены тегом benchmark и по умолчанию
+    пропускаются; запуск: manage.py test --tag benchmark.
+    """
+
+    def __init__(self, *args, tags=None, exclude_tags=None, **kwargs):
+        exclude_tags = set(exclude_tags or ())
+        if BENCHMARK_TAG not in (tags or ()):
+            exclude_tags.add(BENCHMARK_TAG)
+        super().__init__(
+            *args, tags=tags, exclude_tags=exclude_tags, **kwargs)
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.root = tempfile.mkdtemp(prefix="foodgram-tests-")
+        self.test_settings = override_settings(
+            CACHES={
+                **settings.CACHES,
+                "default": {
+                    "BACKEND":
+                        "django.core.cache.backends.locmem.LocMemCache",
+                },
+            },
+            TASKS_EAGER=True,
+            TAGS_SNAPSHOT_CHECK_INTERVAL=0,
+            MEDIA_ROOT=f"{self.root}/media",
+            SHOPPING_LIST_ROOT=f"{self.root}/shopping_lists",
+            METRICS_ROOT=f"{self.root}/metrics",
+            PROFILING_ROOT=f"{self.root}/profiles",
+            PASSWORD_HASHING_LOCK_DIR=f"{self.root}/hashing",
+            PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+        )
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        shutil.rmtree(self.root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,47 @@
+from django.contrib import admin
+from django.test import RequestFactory
+
+from api.tests.utils import FoodgramTestCase, create_recipe, create_user
+from recipes.models import Favorite, Recipe
+from users.models import Follow, User
+
+
+class IndexedSearchTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.request = RequestFactory().get("/admin/")
+        self.alice = create_user("alice", email="Alice@Example.com")
+        self.bob = create_user("bob", email="bob@example.com")
+        # Латиница: LOWER в SQLite меняет регистр только у ASCII.
+        self.borscht = create_recipe(self.alice, "Borscht")
+        self.pie = create_recipe(self.bob, "Pie")
+
+    def search(self, model, term):
+        model_admin = admin.site._registry[model]
+        queryset, may_have_duplicates = model_admin.get_search_results(
+            self.request, model.objects.all(), term)
+        self.assertFalse(may_have_duplicates)
+        return queryset
+
+    def test_prefix_search_is_case_insensitive(self):
+        self.assertEqual(list(self.search(User, "ALI")), [self.alice])
+        self.assertEqual(list(self.search(User, "bob@")), [self.bob])
+        self.assertEqual(list(self.search(Recipe, "bOr")), [self.borscht])
+
+    def test_exact_search_on_related_email(self):
+        Follow.objects.create(user=self.alice, author=self.bob)
+        Favorite.objects.create(user=self.bob, recipe=self.borscht)
+        self.assertEqual(
+            self.search(Follow, "alice@example.COM").get().author, self.bob)
+        self.assertFalse(self.search(Follow, "alice@").exists())
+        self.assertEqual(
+            self.search(Favorite, "BORSCHT").get().user, self.bob)
+
+    def test_uses_index_expression(self):
+        sql = str(self.search(Follow, "alice@example.com").query)
+        self.assertIn('COLLATE "C"', sql)
+        self.assertIn("LOWER(", sql)
+        self.assertNotIn("UPPER(", sql)
+
+    def test_empty_term_returns_everything(self):
+        self.assertEqual(self.search(User, "  ").count(), 2)
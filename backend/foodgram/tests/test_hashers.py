@@ -0,0 +1,133 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import check_password, make_password
+from django.test import SimpleTestCase, override_settings, tag
+from rest_framework.test import APIClient
+
+from api.tests.utils import FoodgramTestCase, create_user
+from foodgram.hashers import HashingBusy, hashing_slot, hashing_timeout
+
+
+class SlotHolder:
+    """
+    Занимает слот хеширования в другом потоке до выхода из блока.
+    """
+
+    def __enter__(self):
+        taken, self.release = threading.Event(), threading.Event()
+
+        def hold():
+            with hashing_slot():
+                taken.set()
+                self.release.wait()
+
+        self.thread = threading.Thread(target=hold)
+        self.thread.start()
+        taken.wait()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release.set()
+        self.thread.join()
+
+
+@override_settings(PASSWORD_HASHING_SLOTS=1, PASSWORD_HASHING_TIMEOUT=0.05)
+class HashingSlotTest(SimpleTestCase):
+    def test_busy_when_all_slots_are_taken(self):
+        with SlotHolder():
+            with self.assertRaises(HashingBusy), hashing_timeout(0.05):
+                with hashing_slot():
+                    pass
+        with hashing_timeout(0.05), hashing_slot():
+            pass
+
+    def test_waits_for_slot_without_timeout(self):
+        with SlotHolder() as holder:
+            threading.Timer(0.1, holder.release.set).start()
+            start = time.monotonic()
+            with hashing_slot():
+                pass
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+    def test_nested_use_does_not_wait_for_itself(self):
+        with hashing_slot():
+            with hashing_slot():
+                pass
+
+
+@override_settings(
+    PASSWORD_HASHING_SLOTS=1, PASSWORD_HASHING_TIMEOUT=0.05,
+    PASSWORD_HASHERS=["foodgram.hashers.PBKDF2PasswordHasher"])
+class HashingBusyResponseTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(
+            "reader", password=make_password("Secret-123"))
+
+    def login(self):
+        return APIClient().post(
+            "/api/auth/token/login/",
+            {"email": self.user.email, "password": "Secret-123"},
+            format="json")
+
+    def test_api_login_is_refused_with_503(self):
+        with SlotHolder():
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_backend_login_waits_for_slot(self):
+        with SlotHolder() as holder:
+            threading.Timer(0.1, holder.release.set).start()
+            user = authenticate(email=self.user.email, password="Secret-123")
+        self.assertEqual(user, self.user)
+
+
+@tag("benchmark")
+class LoginThroughputBenchmark(FoodgramTestCase):
+    """
+    Пропускная способность входа /api/auth/token/login/ на одно ядро
+    для каждого алгоритма с настроенной стоимостью, и проверка пароля
+    в четыре потока: слоты хеширования не дают ей занять больше
+    PASSWORD_HASHING_SLOTS ядер, а не дождавшиеся слота получают отказ.
+    """
+
+    logins = 10
+
+    def login(self, user):
+        response = APIClient().post(
+            "/api/auth/token/login/",
+            {"email": user.email, "password": "Secret-123"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_logins_per_second(self):
+        print("\nВход по паролю, входов в секунду")
+        for name, hasher in settings.PASSWORD_HASHER_ORDER.items():
+            with override_settings(PASSWORD_HASHERS=[hasher]):
+                user = create_user(
+                    f"user-{name}", password=make_password("Secret-123"))
+                self.assertTrue(check_password("Secret-123", user.password))
+                start = time.perf_counter()
+                for _ in range(self.logins):
+                    self.login(user)
+                sequential = self.logins / (time.perf_counter() - start)
+                start = time.perf_counter()
+                with ThreadPoolExecutor(4) as executor:
+                    results = list(executor.map(
+                        lambda _: self.verify(user), range(self.logins)))
+                parallel = results.count(True) / (
+                    time.perf_counter() - start)
+            print(f"  {name:<8} одно ядро {sequential:8.1f}  "
+                  f"4 потока, слотов {settings.PASSWORD_HASHING_SLOTS}: "
+                  f"{parallel:8.1f}, отказов {results.count(None)}")
+
+    def verify(self, user):
+        try:
+            with hashing_timeout(settings.PASSWORD_HASHING_TIMEOUT):
+                return check_password("Secret-123", user.password)
+        except HashingBusy:
+            return None
@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+
+from foodgram.metrics import MERGED_FILE, collect
+
+
+def snapshot(value):
+    return {
+        "counters": [["db_queries_total", [["route", "recipes"]], value]],
+        "histograms": [
+            ["http_request_duration_seconds", [], [1] + [0] * 10, 0.1, 1]],
+    }
+
+
+class CollectTest(SimpleTestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        self.settings = override_settings(METRICS_ROOT=str(self.root))
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        process = subprocess.Popen([sys.executable, "-c", ""])
+        process.wait()
+        self.dead_pid = process.pid
+
+    def write(self, pid, value):
+        (self.root / f"{pid}-{value}.json").write_text(
+            json.dumps(snapshot(value)))
+
+    def totals(self):
+        counters, histograms = collect()
+        return (counters["db_queries_total", (("route", "recipes"),)],
+                histograms["http_request_duration_seconds", ()][2])
+
+    def test_dead_process_files_are_merged_once(self):
+        self.write(os.getpid(), 1)
+        self.write(self.dead_pid, 10)
+        self.write(self.dead_pid, 100)
+        self.assertEqual(self.totals(), (111, 3))
+        self.assertEqual(
+            sorted(path.name for path in self.root.glob("*.json")),
+            sorted([f"{os.getpid()}-1.json", MERGED_FILE]))
+        self.assertEqual(self.totals(), (111, 3))
+
+    def test_later_dead_files_add_to_merged(self):
+        self.write(self.dead_pid, 10)
+        self.totals()
+        self.write(self.dead_pid, 5)
+        self.assertEqual(self.totals(), (15, 2))
+        self.assertEqual(
+            [path.name for path in self.root.glob("*.json")], [MERGED_FILE])
+
+
+@override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"], METRICS_TOKEN="secret")
+class MetricsAccessTest(SimpleTestCase):
+    def get(self, **headers):
+        return self.client.get("/metrics", **headers)
+
+    def test_anonymous_request_is_denied(self):
+        self.assertEqual(self.get(REMOTE_ADDR="10.0.0.5").status_code, 403)
+        self.assertEqual(self.get(
+            REMOTE_ADDR="10.0.0.5",
+            HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+
+    def test_allowed_address(self):
+        self.assertEqual(self.get(REMOTE_ADDR="127.0.0.1").status_code, 200)
+
+    def test_bearer_token(self):
+        response = self.get(
+            REMOTE_ADDR="10.0.0.5", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_empty_token_is_never_accepted(self):
+        self.assertEqual(self.get(
+            REMOTE_ADDR="10.0.0.5",
+            HTTP_AUTHORIZATION="Bearer ").status_code, 403)
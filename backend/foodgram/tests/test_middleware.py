@@ -0,0 +1,111 @@
+import gzip
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from api.tests.utils import FoodgramTestCase, create_user
+from foodgram.middleware import (
+    CompressionMiddleware,
+    LoadSheddingMiddleware,
+    ProfilingMiddleware)
+from foodgram.profiling import list_profiles
+
+
+@override_settings(COMPRESSION_MIN_SIZE=10)
+class CompressionMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def respond(self, body, etag='"1"'):
+        def get_response(request):
+            response = HttpResponse(body, content_type="application/json")
+            if etag:
+                response["ETag"] = etag
+            return response
+
+        request = RequestFactory().get(
+            "/api/recipes/1/", HTTP_ACCEPT_ENCODING="gzip")
+        return CompressionMiddleware(get_response)(request)
+
+    def test_compresses_and_weakens_etag(self):
+        body = b'{"text": "' + b"a" * 500 + b'"}'
+        response = self.respond(body)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["ETag"], 'W/"1"')
+        self.assertEqual(gzip.decompress(response.content), body)
+
+    def test_same_etag_different_bodies_are_not_shared(self):
+        first = b'{"is_favorited": true, "text": "' + b"a" * 500 + b'"}'
+        second = b'{"is_favorited": false, "text": "' + b"a" * 500 + b'"}'
+        self.assertEqual(gzip.decompress(self.respond(first).content), first)
+        self.assertEqual(
+            gzip.decompress(self.respond(second).content), second)
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.respond(b"{}")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+
+@override_settings(LOAD_SHEDDING_QUEUE_LATENCY=2,
+                   LOAD_SHEDDING_PATHS=("/api/ingredients/",))
+class LoadSheddingMiddlewareTest(SimpleTestCase):
+    middleware = LoadSheddingMiddleware(lambda request: HttpResponse("ok"))
+
+    def call(self, method, path, waited):
+        request = getattr(RequestFactory(), method)(
+            path, HTTP_X_REQUEST_START=f"t={time.time() - waited:.3f}")
+        return self.middleware(request)
+
+    def test_sheds_writes_and_listed_paths_after_queue_wait(self):
+        self.assertEqual(self.call("post", "/api/recipes/", 5).status_code,
+                         503)
+        response = self.call("get", "/api/ingredients/", 5)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "5")
+
+    def test_keeps_serving_reads_and_fresh_requests(self):
+        self.assertEqual(self.call("get", "/api/recipes/", 5).status_code,
+                         200)
+        self.assertEqual(self.call("post", "/api/recipes/", 0).status_code,
+                         200)
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0)
+class ProfilingMiddlewareTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.middleware = ProfilingMiddleware(self.respond)
+        self.profiling = []
+
+    def respond(self, request):
+        self.profiling.append(self.middleware.lock.locked())
+        return HttpResponse("ok")
+
+    def call(self, user=None):
+        headers = {"HTTP_X_PROFILE": "1"}
+        if user:
+            headers["HTTP_AUTHORIZATION"] = (
+                f"Token {Token.objects.create(user=user).key}")
+        request = RequestFactory().get("/api/recipes/", **headers)
+        request.user = AnonymousUser()
+        return self.middleware(request)
+
+    def test_staff_header_is_profiled(self):
+        response = self.call(create_user("staff", is_staff=True))
+        self.assertEqual(self.profiling, [True])
+        self.assertEqual(
+            list_profiles()[0]["name"], response["X-Profile-Name"])
+
+    def test_header_from_others_does_not_start_profiler(self):
+        self.call()
+        self.call(create_user("reader"))
+        response = self.middleware(RequestFactory().get(
+            "/", HTTP_X_PROFILE="1", HTTP_AUTHORIZATION="Token invalid"))
+        self.assertEqual(self.profiling, [False, False, False])
+        self.assertFalse(response.has_header("X-Profile-Name"))
+        self.assertEqual(list_profiles(), [])
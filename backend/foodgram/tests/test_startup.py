@@ -0,0 +1,26 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from api.management.commands.importtime import parse_importtime
+
+
+class StartupImportsTest(SimpleTestCase):
+    def test_lazy_modules_are_not_imported_at_startup(self):
+        # Команда завершается ошибкой, если модуль из LAZY_IMPORTS
+        # оказался в sys.modules после загрузки приложения.
+        output = StringIO()
+        call_command("importtime", "--top", "0", stdout=output)
+        self.assertIn("Ленивые импорты не загружены.", output.getvalue())
+
+    def test_parse_importtime(self):
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   json.decoder\n"
+            "import time:       300 |        420 | json\n"
+        )
+        self.assertEqual(parse_importtime(output), [
+            ("json.decoder", 120, 120, 1),
+            ("json", 300, 420, 0),
+        ])
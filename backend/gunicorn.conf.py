@@ -0,0 +1,37 @@
+"""
+Настройки gunicorn.
+
+Приложение загружается в мастере до fork (preload_app), поэтому
+воркеры получают уже импортированные модули и делят их память
+по принципу copy-on-write.
+"""
+
+import gc
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", 1))
+preload_app = True
+
+
+def when_ready(server):
+    """
+    Вызывается в мастере перед запуском воркеров: загружает
+    URLconf вместе с представлениями и сериализаторами, которые Django
+    иначе импортирует при первом запросе в каждом воркере, и переносит
+    созданные объекты в постоянное поколение сборщика мусора, чтобы
+    его проходы в воркерах не копировали общие страницы памяти.
+    """
+
+    from django.db import connections
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    connections.close_all()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from django.db import connections
+
+    connections.close_all()
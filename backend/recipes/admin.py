@@ -1,5 +1,8 @@
 from django.contrib import admin
+from django.db.models import Count
 
+from foodgram.admin_search import IndexedSearchMixin
+from foodgram.paginator import EstimatedCountPaginator
 from .models import (
     Cart,
     Favorite,
@@ -15,6 +18,7 @@ class IngredientsInLine(admin.TabularInline):
     """
 
     model = Recipe.ingredients.through
+    autocomplete_fields = ("ingredient",)
 
 
 class TagsInLine(admin.TabularInline):
@@ -35,51 +39,78 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(IndexedSearchMixin, admin.ModelAdmin):
     """
     Административный класс для модели Ingredient.
     """
 
-    list_filter = ("name",)
+    list_filter = ("measurement_unit",)
     list_display = ("name", "measurement_unit")
+    search_fields = ("^name",)
+
+
+class RelationAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    """
+    Базовый административный класс для больших таблиц связей
+    пользователь-рецепт.
+    """
+
+    list_display = ("recipe", "user")
+    list_select_related = ("recipe__author", "user")
+    raw_id_fields = ("recipe", "user")
+    search_fields = ("=user__email", "=recipe__name")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(IndexedSearchMixin, admin.ModelAdmin):
     """
     Административный класс для модели Recipe.
     """
 
     list_display = ("name", "author", "count_favorite")
-    list_filter = ("name", "author", "tags")
+    list_filter = ("tags",)
+    list_select_related = ("author",)
+    search_fields = ("^name", "=author__email")
+    raw_id_fields = ("author",)
     inlines = (IngredientsInLine, TagsInLine)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            favorites_count=Count("favorites"))
+
+    @admin.display(description="В избранном",
+                   ordering="favorites_count")
     def count_favorite(self, instance):
-        return instance.favorites.count()
+        return instance.favorites_count
 
 
 @admin.register(IngredientForRecipe)
-class IngredientForRecipe(admin.ModelAdmin):
+class IngredientForRecipe(IndexedSearchMixin, admin.ModelAdmin):
     """
     Административный класс для модели IngredientForRecipe.
     """
 
     list_display = ("ingredient", "recipe", "amount")
+    list_select_related = ("ingredient", "recipe__author")
+    raw_id_fields = ("ingredient", "recipe")
+    search_fields = ("=recipe__name",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(RelationAdmin):
     """
     Административный класс для модели Favorite.
     """
 
-    list_display = ("recipe", "user")
-
 
 @admin.register(Cart)
-class CartAdmin(admin.ModelAdmin):
+class CartAdmin(RelationAdmin):
     """
     Административный класс для модели Cart.
     """
-
-    list_display = ("recipe", "user")
@@ -0,0 +1,42 @@
+from django.db import connections, transaction
+
+from .models import ArchivedCart, Cart, StaleSimilarity
+
+
+def archive_carts(carts):
+    """
+    Переносит строки корзины из выборки carts в архив одной транзакцией
+    и возвращает число перенесённых строк.
+    Удаление выполняется одним запросом без сигналов post_delete:
+    для очищенной корзины пересчитывать список покупок не нужно,
+    а рецепты отмечаются для пересчёта похожих здесь же.
+    """
+
+    connection = connections[carts.db]
+
+    with transaction.atomic():
+        rows = list(carts.select_for_update().values_list(
+            "id", "user_id", "recipe_id", "added"))
+        if not rows:
+            return 0
+        ArchivedCart.objects.bulk_create([
+            ArchivedCart(user_id=user_id, recipe_id=recipe_id, added=added)
+            for _, user_id, recipe_id, added in rows
+        ])
+        # QuerySet.delete() разослал бы post_delete для каждой строки,
+        # поэтому строки удаляются прямым DELETE по уже заблокированным id.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM {} WHERE {} IN ({})".format(
+                    connection.ops.quote_name(Cart._meta.db_table),
+                    connection.ops.quote_name(Cart._meta.pk.column),
+                    ", ".join(["%s"] * len(rows)),
+                ),
+                [row[0] for row in rows],
+            )
+        StaleSimilarity.objects.bulk_create(
+            [StaleSimilarity(recipe_id=recipe_id)
+             for recipe_id in {row[2] for row in rows}],
+            ignore_conflicts=True,
+        )
+    return len(rows)
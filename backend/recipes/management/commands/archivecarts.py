@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.archive import archive_carts
+from recipes.models import Cart
+
+
+class Command(BaseCommand):
+    """
+    Команда переноса давно добавленных строк списка покупок в архив.
+    Строки переносятся пачками, каждая пачка — в своей транзакции,
+    поэтому команду можно запускать по расписанию на рабочей базе.
+    """
+
+    help = "Переносит устаревшие строки списков покупок в архив."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.CART_ARCHIVE_AFTER_DAYS,
+            help="Архивировать строки старше указанного числа дней.")
+        parser.add_argument(
+            "--batch-size", type=int,
+            default=settings.CART_ARCHIVE_BATCH_SIZE,
+            help="Сколько строк переносить за одну транзакцию.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        stale = Cart.objects.filter(added__lt=cutoff)
+        total = 0
+        while True:
+            cart_ids = list(stale.order_by("added").values_list(
+                "id", flat=True)[:options["batch_size"]])
+            if not cart_ids:
+                break
+            total += archive_carts(stale.filter(pk__in=cart_ids))
+        self.stdout.write(self.style.SUCCESS(
+            f"Перенесено в архив строк: {total}"))
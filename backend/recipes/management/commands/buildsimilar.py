@@ -0,0 +1,105 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+
+from recipes.models import (
+    Cart,
+    Favorite,
+    Recipe,
+    SimilarRecipe,
+    StaleSimilarity)
+
+# Связи пользователь-рецепт и их related_name со стороны пользователя.
+RELATIONS = ((Favorite, "favorites"), (Cart, "shopping_cart"))
+
+
+class Command(BaseCommand):
+    """
+    Команда пересчёта похожих рецептов по совместным добавлениям
+    в избранное и список покупок.
+    По умолчанию пересчитываются только рецепты, отмеченные как
+    изменившиеся с прошлого запуска.
+    """
+
+    help = "Пересчитывает похожие рецепты."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true",
+            help="Пересчитать все рецепты.")
+        parser.add_argument(
+            "--chunk-size", type=int, default=500,
+            help="Сколько рецептов обрабатывать за один проход.")
+
+    def handle(self, *args, **options):
+        if options["full"]:
+            recipe_ids = list(Recipe.objects.values_list("id", flat=True))
+        else:
+            recipe_ids = list(
+                StaleSimilarity.objects.values_list("recipe_id", flat=True))
+        popularity = self.get_popularity()
+        chunk_size = options["chunk_size"]
+        for start in range(0, len(recipe_ids), chunk_size):
+            self.process(recipe_ids[start:start + chunk_size], popularity)
+        if options["full"]:
+            # Отметки удалённых рецептов не попали ни в одну пачку.
+            StaleSimilarity.objects.exclude(
+                recipe_id__in=Recipe.objects.values("id")).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"Пересчитано рецептов: {len(recipe_ids)}"))
+
+    def get_popularity(self):
+        popularity = Counter()
+        for model, _ in RELATIONS:
+            for row in model.objects.values("recipe_id").annotate(
+                count=Count("id")
+            ):
+                popularity[row["recipe_id"]] += row["count"]
+        return popularity
+
+    def get_cooccurrence(self, recipe_ids):
+        """
+        Число пользователей, добавивших одновременно рецепт из пачки
+        и другой рецепт. Подсчёт выполняется в базе данных.
+        """
+
+        cooccurrence = defaultdict(Counter)
+        for model, related_name in RELATIONS:
+            target = f"user__{related_name}__recipe_id"
+            rows = (
+                model.objects.filter(**{f"{target}__in": recipe_ids})
+                .annotate(target=F(target))
+                .exclude(recipe_id=F("target"))
+                .values("target", "recipe_id")
+                .annotate(count=Count("id"))
+                .order_by()
+            )
+            for row in rows.iterator():
+                cooccurrence[row["target"]][row["recipe_id"]] += row["count"]
+        return cooccurrence
+
+    def process(self, recipe_ids, popularity):
+        top_k = settings.SIMILAR_RECIPES_TOP_K
+        similar = []
+        for recipe_id, counts in self.get_cooccurrence(recipe_ids).items():
+            scores = (
+                (count / math.sqrt(popularity[recipe_id] * popularity[other]),
+                 other)
+                for other, count in counts.items()
+            )
+            similar.extend(
+                SimilarRecipe(recipe_id=recipe_id, similar_id=other,
+                              score=score)
+                for score, other in heapq.nlargest(top_k, scores)
+            )
+        # Отметки снимаются вместе с записью пачки: если команда
+        # упадёт, необработанные рецепты пересчитает следующий запуск.
+        with transaction.atomic():
+            SimilarRecipe.objects.filter(recipe_id__in=recipe_ids).delete()
+            SimilarRecipe.objects.bulk_create(similar, batch_size=1000)
+            StaleSimilarity.objects.filter(recipe_id__in=recipe_ids).delete()
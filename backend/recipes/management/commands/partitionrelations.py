@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import Cart, Favorite
+
+
+class Command(BaseCommand):
+    """
+    Команда перевода таблиц избранного и списка покупок
+    на хеш-секционирование по user_id в PostgreSQL.
+    Проверки «рецепт в избранном/корзине» и сборка списка покупок
+    фильтруют по пользователю и читают только одну секцию.
+    Таблица пересоздаётся с копированием данных под эксклюзивной
+    блокировкой, поэтому команду стоит запускать в окно обслуживания.
+    Уже секционированные таблицы пропускаются.
+    """
+
+    help = "Секционирует таблицы избранного и корзины по пользователю."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--partitions", type=int, default=settings.RELATION_PARTITIONS,
+            help="Число секций.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError(
+                "Секционирование поддерживается только в PostgreSQL.")
+        for model in (Favorite, Cart):
+            table = model._meta.db_table
+            with transaction.atomic(), connection.cursor() as cursor:
+                if self.is_partitioned(cursor, table):
+                    self.stdout.write(f"{table}: уже секционирована")
+                    continue
+                self.partition(cursor, table, options["partitions"])
+            self.stdout.write(self.style.SUCCESS(
+                f"{table}: секций {options['partitions']}"))
+
+    def is_partitioned(self, cursor, table):
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = %s::regclass", [table])
+        return cursor.fetchone() is not None
+
+    def partition(self, cursor, table, partitions):
+        quote = connection.ops.quote_name
+        old_table = f"{table}_unpartitioned"
+        cursor.execute(
+            "SELECT conname, contype, pg_get_constraintdef(oid) "
+            "FROM pg_constraint WHERE conrelid = %s::regclass", [table])
+        constraints = cursor.fetchall()
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes "
+            "WHERE tablename = %s AND NOT indexname = ANY(%s)",
+            [table, [name for name, _, _ in constraints]])
+        indexes = [indexdef for indexdef, in cursor.fetchall()]
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        sequence, = cursor.fetchone()
+
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} RENAME TO {quote(old_table)}")
+        cursor.execute(
+            f"CREATE TABLE {quote(table)} "
+            f"(LIKE {quote(old_table)} INCLUDING DEFAULTS) "
+            f"PARTITION BY HASH (user_id)")
+        for remainder in range(partitions):
+            cursor.execute(
+                f"CREATE TABLE {quote(f'{table}_p{remainder}')} "
+                f"PARTITION OF {quote(table)} FOR VALUES WITH "
+                f"(MODULUS {partitions}, REMAINDER {remainder})")
+        cursor.execute(
+            f"INSERT INTO {quote(table)} SELECT * FROM {quote(old_table)}")
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {quote(table)}.id")
+        cursor.execute(f"DROP TABLE {quote(old_table)}")
+
+        # Имена ограничений и индексов освободились вместе со старой
+        # таблицей. Уникальные ключи секционированной таблицы обязаны
+        # включать user_id, поэтому первичный ключ становится составным.
+        for name, kind, definition in constraints:
+            if kind == "p":
+                definition = "PRIMARY KEY (id, user_id)"
+            cursor.execute(
+                f"ALTER TABLE {quote(table)} "
+                f"ADD CONSTRAINT {quote(name)} {definition}")
+        for indexdef in indexes:
+            cursor.execute(indexdef)
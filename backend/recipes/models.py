@@ -1,6 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
+from django.db.models.functions import Collate, Lower
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -47,6 +51,13 @@ class Ingredient(models.Model):
         verbose_name = "Ингридиент"
         verbose_name_plural = "Ингридиенты"
         ordering = ("name",)
+        # Поиск в админке по началу названия без учёта регистра.
+        indexes = [
+            models.Index(
+                Collate(Lower("name"), "C"),
+                name="ingredient_name_prefix_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -86,6 +97,11 @@ class Recipe(models.Model):
     )
     pub_date = models.DateTimeField(
         verbose_name="Дата публикации", auto_now_add=True)
+    version = models.PositiveIntegerField(
+        verbose_name="Версия",
+        default=1,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = "Рецепт"
@@ -97,6 +113,14 @@ class Recipe(models.Model):
                 name="unique_for_author",
             ),
         )
+        # Поиск в админке по названию: точный и по началу,
+        # без учёта регистра.
+        indexes = [
+            models.Index(
+                Collate(Lower("name"), "C"),
+                name="recipe_name_prefix_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name}. Автор: {self.author.username}"
@@ -184,6 +208,10 @@ class Cart(models.Model):
         on_delete=models.CASCADE,
         related_name="shopping_cart",
     )
+    added = models.DateTimeField(
+        verbose_name="Дата добавления",
+        default=timezone.now,
+    )
 
     class Meta:
         verbose_name = "Рецепт в списке покупок"
@@ -192,7 +220,194 @@ class Cart(models.Model):
             models.UniqueConstraint(
                 fields=["user", "recipe"], name="already in cart")
         ]
+        indexes = [models.Index(fields=["added"])]
 
     def __str__(self) -> str:
         return (f'{self.user.username} добавил рецепт'
                 f'"{self.recipe.name}" в избранное')
+
+
+class ArchivedCart(models.Model):
+    """
+    Класс хранит строки списка покупок, перенесённые в архив
+    при очистке корзины или по давности добавления.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name="Рецепт",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    user = models.ForeignKey(
+        User,
+        verbose_name="Пользователь",
+        on_delete=models.CASCADE,
+        related_name="archived_carts",
+    )
+    added = models.DateTimeField(verbose_name="Дата добавления")
+    archived = models.DateTimeField(
+        verbose_name="Дата архивации",
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = "Рецепт в архиве списков покупок"
+        verbose_name_plural = "Рецепты в архиве списков покупок"
+        indexes = [models.Index(fields=["user", "-archived"])]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.recipe_id}"
+
+
+class RecipeCard(models.Model):
+    """
+    Класс хранит денормализованную карточку рецепта для списка
+    рецептов: автора, дату, id тегов и готовое представление рецепта
+    с автором, тегами и ингредиентами.
+    Карточки перестраиваются в транзакции записи рецепта, поэтому
+    связи объявлены без ограничений внешнего ключа: удаление рецепта
+    или автора само удаляет карточку.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        verbose_name="Рецепт",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name="card",
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name="Автор",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    pub_date = models.DateTimeField(verbose_name="Дата публикации")
+    tag_ids = ArrayField(
+        models.IntegerField(),
+        verbose_name="Теги",
+        default=list,
+    )
+    data = models.JSONField(verbose_name="Представление")
+
+    class Meta:
+        verbose_name = "Карточка рецепта"
+        verbose_name_plural = "Карточки рецептов"
+        ordering = ("-pub_date",)
+        indexes = [
+            models.Index(fields=["-pub_date"]),
+            models.Index(fields=["author", "-pub_date"]),
+            GinIndex(fields=["tag_ids"]),
+        ]
+
+    def __str__(self):
+        return str(self.recipe_id)
+
+
+class FeedEntry(models.Model):
+    """
+    Класс представляет запись ленты подписок пользователя:
+    рецепт автора, на которого подписан пользователь.
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name="Владелец ленты",
+        on_delete=models.CASCADE,
+        related_name="feed",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name="Рецепт",
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name="Автор",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    pub_date = models.DateTimeField(verbose_name="Дата публикации")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        ordering = ("-pub_date",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"], name="already in feed")
+        ]
+        indexes = [
+            models.Index(fields=["user", "-pub_date"]),
+            models.Index(fields=["user", "author"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} <- {self.recipe_id}"
+
+
+class SimilarRecipe(models.Model):
+    """
+    Класс представляет рецепт из списка похожих на данный рецепт.
+    Заполняется командой buildsimilar по совместным добавлениям
+    в избранное и список покупок.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name="Рецепт",
+        on_delete=models.CASCADE,
+        related_name="similar",
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        verbose_name="Похожий рецепт",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    score = models.FloatField(verbose_name="Сходство")
+
+    class Meta:
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        ordering = ("-score",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipe", "similar"], name="unique_similar")
+        ]
+        indexes = [
+            models.Index(fields=["recipe", "-score"]),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id} ~ {self.similar_id}: {self.score:.3f}"
+
+
+class StaleSimilarity(models.Model):
+    """
+    Класс отмечает рецепты, у которых изменились избранное или корзина
+    с последнего пересчёта похожих рецептов.
+    Отметка ставится и при каскадном удалении избранного вместе
+    с рецептом, поэтому связь объявлена без ограничения внешнего ключа;
+    отметки удалённых рецептов снимает buildsimilar.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        verbose_name="Рецепт",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name="+",
+    )
+
+    class Meta:
+        verbose_name = "Рецепт для пересчёта похожих"
+        verbose_name_plural = "Рецепты для пересчёта похожих"
+
+    def __str__(self):
+        return str(self.recipe_id)
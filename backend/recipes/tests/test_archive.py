@@ -0,0 +1,124 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import tag
+from django.utils import timezone
+
+from api.shopping_list import get_shopping_list
+from api.tests.utils import (
+    FoodgramTestCase,
+    benchmark_scale,
+    create_ingredients,
+    create_recipe,
+    create_user,
+    measure,
+    report)
+from recipes.archive import archive_carts
+from recipes.models import ArchivedCart, Cart, StaleSimilarity
+
+
+class ArchiveCartsTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = create_user("reader")
+        author = create_user("author")
+        self.recipes = [create_recipe(author, f"recipe{index}")
+                        for index in range(3)]
+        old = timezone.now() - timedelta(days=60)
+        self.stale = [Cart.objects.create(user=self.user, recipe=recipe,
+                                          added=old)
+                      for recipe in self.recipes[:2]]
+        self.fresh = Cart.objects.create(user=self.user,
+                                         recipe=self.recipes[2])
+
+    def test_moves_rows_and_marks_recipes(self):
+        moved = archive_carts(Cart.objects.filter(
+            pk__in=[cart.pk for cart in self.stale]))
+        self.assertEqual(moved, 2)
+        self.assertEqual(list(Cart.objects.all()), [self.fresh])
+        self.assertCountEqual(
+            ArchivedCart.objects.values_list("recipe_id", flat=True),
+            [recipe.id for recipe in self.recipes[:2]])
+        self.assertTrue(StaleSimilarity.objects.filter(
+            recipe_id=self.recipes[0].id).exists())
+
+    def test_empty_selection(self):
+        self.assertEqual(archive_carts(Cart.objects.none()), 0)
+
+    def test_command_archives_in_batches(self):
+        call_command("archivecarts", days=30, batch_size=1, stdout=StringIO())
+        self.assertEqual(list(Cart.objects.all()), [self.fresh])
+        self.assertEqual(ArchivedCart.objects.count(), 2)
+
+
+@tag("benchmark")
+class RelationGrowthBenchmark(FoodgramTestCase):
+    """
+    Проверка «рецепт в корзине» и сборка списка покупок одного
+    пользователя при росте таблицы корзины устаревшими строками
+    других пользователей и после их переноса в архив командой
+    archivecarts. Объём задаётся BENCHMARK_SCALE.
+    """
+
+    recipes = 100
+
+    def setUp(self):
+        super().setUp()
+        author = create_user("author")
+        ingredients = create_ingredients(20)
+        self.recipe_ids = [
+            create_recipe(
+                author, f"recipe{index}",
+                ingredients=[(ingredient, 10) for ingredient in
+                             ingredients[index % 10:index % 10 + 5]]).id
+            for index in range(self.recipes)
+        ]
+        self.users = [create_user(f"user{index}")
+                      for index in range(int(200 * benchmark_scale()))]
+        self.reader = self.users[0]
+        Cart.objects.bulk_create(
+            Cart(user=self.reader, recipe_id=recipe_id)
+            for recipe_id in self.recipe_ids[:10])
+
+    def grow(self, rows):
+        """
+        Догоняет таблицу корзины до rows строк устаревшими строками.
+        """
+
+        added = timezone.now() - timedelta(days=90)
+        existing = Cart.objects.count()
+        others = self.users[1:]
+        Cart.objects.bulk_create(
+            (Cart(user=others[index // self.recipes % len(others)],
+                  recipe_id=self.recipe_ids[index % self.recipes],
+                  added=added)
+             for index in range(existing, rows)),
+            batch_size=5000, ignore_conflicts=True,
+        )
+
+    def test_latency_as_table_grows(self):
+        recipe_id = self.recipe_ids[0]
+
+        def in_cart():
+            return Cart.objects.filter(
+                user=self.reader, recipe_id=recipe_id).exists()
+
+        def shopping_list():
+            return get_shopping_list(self.reader.id)
+
+        expected = shopping_list()
+        max_rows = self.recipes * (len(self.users) - 1)
+        for rows in (max_rows // 100, max_rows // 10, max_rows):
+            self.grow(rows)
+            self.assertEqual(shopping_list(), expected)
+            report(f"Корзина, {Cart.objects.count()} строк", [
+                ("рецепт в корзине", *measure(in_cart)),
+                ("список покупок", *measure(shopping_list)),
+            ])
+        call_command("archivecarts", stdout=StringIO())
+        self.assertEqual(shopping_list(), expected)
+        report(f"После archivecarts, {Cart.objects.count()} строк", [
+            ("рецепт в корзине", *measure(in_cart)),
+            ("список покупок", *measure(shopping_list)),
+        ])
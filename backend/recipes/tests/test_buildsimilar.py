@@ -0,0 +1,50 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+
+from api.tests.utils import FoodgramTestCase, create_recipe, create_user
+from recipes.management.commands.buildsimilar import Command
+from recipes.models import Favorite, SimilarRecipe, StaleSimilarity
+
+
+class BuildSimilarTest(FoodgramTestCase):
+    def setUp(self):
+        super().setUp()
+        author = create_user("author")
+        self.recipes = [create_recipe(author, f"recipe{index}")
+                        for index in range(4)]
+        for username in ("first", "second"):
+            user = create_user(username)
+            for recipe in self.recipes:
+                Favorite.objects.create(user=user, recipe=recipe)
+
+    def build(self, *args):
+        call_command("buildsimilar", "--chunk-size", "2", *args,
+                     stdout=StringIO())
+
+    def test_build_clears_markers(self):
+        self.build()
+        self.assertFalse(StaleSimilarity.objects.exists())
+        self.assertEqual(
+            set(SimilarRecipe.objects.values_list("recipe_id", flat=True)),
+            {recipe.pk for recipe in self.recipes})
+
+    def test_crash_keeps_markers_of_unprocessed_chunks(self):
+        process = Command.process
+        calls = []
+
+        def crash_on_second_chunk(command, recipe_ids, popularity):
+            calls.append(recipe_ids)
+            if len(calls) == 2:
+                raise RuntimeError
+            process(command, recipe_ids, popularity)
+
+        with mock.patch.object(Command, "process", crash_on_second_chunk), \
+                self.assertRaises(RuntimeError):
+            self.build()
+        self.assertCountEqual(
+            StaleSimilarity.objects.values_list("recipe_id", flat=True),
+            calls[1])
+        self.build()
+        self.assertFalse(StaleSimilarity.objects.exists())
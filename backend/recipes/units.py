@@ -0,0 +1,54 @@
+from django.db.models import Case, F, FloatField, Value, When
+
+# Единица измерения -> (каноническая единица, множитель перевода).
+# Единицы, которых нет в таблице, суммируются как есть.
+UNITS = {
+    "г": ("г", 1),
+    "кг": ("г", 1000),
+    "мл": ("мл", 1),
+    "л": ("мл", 1000),
+    "стакан": ("мл", 250),
+    "ст. л.": ("мл", 15),
+    "ч. л.": ("мл", 5),
+    "капля": ("мл", 0.05),
+    # Количество «по вкусу» не складывается.
+    "по вкусу": ("по вкусу", 0),
+}
+UNCOUNTABLE_UNITS = {"по вкусу"}
+
+
+def canonical_unit(unit_field):
+    """
+    SQL-выражение канонической единицы измерения.
+    """
+
+    return Case(
+        *(When(**{unit_field: unit}, then=Value(canonical))
+          for unit, (canonical, _) in UNITS.items() if unit != canonical),
+        default=F(unit_field),
+    )
+
+
+def canonical_amount(unit_field, amount_field):
+    """
+    SQL-выражение количества в канонической единице измерения.
+    """
+
+    return Case(
+        *(When(**{unit_field: unit},
+               then=F(amount_field) * Value(float(factor)))
+          for unit, (_, factor) in UNITS.items() if factor != 1),
+        default=F(amount_field),
+        output_field=FloatField(),
+    )
+
+
+def format_amount(amount, unit):
+    """
+    Строка количества для списка покупок без лишних нулей в дробной части.
+    """
+
+    if unit in UNCOUNTABLE_UNITS:
+        return unit
+    amount = f"{amount:.2f}".rstrip("0").rstrip(".")
+    return f"{amount} {unit}"
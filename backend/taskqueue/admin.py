@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    """
+    Административный класс для модели Task.
+    """
+
+    list_display = ("name", "status", "attempts", "run_at", "created")
+    list_filter = ("status",)
+    search_fields = ("name",)
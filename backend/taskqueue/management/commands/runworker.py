@@ -0,0 +1,104 @@
+import logging
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait)
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+from taskqueue.worker import claim, run_task
+
+logger = logging.getLogger("taskqueue.worker")
+
+
+class Command(BaseCommand):
+    """
+    Команда запуска воркера очереди фоновых задач.
+    """
+
+    help = "Выполняет задачи из очереди фоновых задач."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=4,
+            help="Число одновременно выполняемых задач.")
+        parser.add_argument(
+            "--processes", action="store_true",
+            help="Выполнять задачи в пуле процессов вместо потоков.")
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Выполнить готовые задачи и завершиться.")
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"]
+        if options["processes"]:
+            # Дочерние процессы не должны наследовать соединения с БД.
+            connections.close_all()
+            executor = ProcessPoolExecutor(concurrency)
+        else:
+            executor = ThreadPoolExecutor(concurrency)
+        self.stdout.write(f"Воркер запущен, задач одновременно: {concurrency}")
+        with executor:
+            try:
+                self.run(executor, concurrency, options["once"])
+            except KeyboardInterrupt:
+                self.stdout.write("Воркер остановлен")
+
+    def run(self, executor, concurrency, once):
+        """
+        Держит занятыми до concurrency слотов: новая задача забирается,
+        как только освобождается слот, поэтому долгая задача не простаивает
+        остальные. С once воркер перестаёт забирать задачи, когда готовых
+        не осталось, и завершается после выполнения начатых.
+        """
+
+        running = {}
+        idle = False
+        while True:
+            claimed = None
+            if not (once and idle) and len(running) < concurrency:
+                claimed = self.claim(concurrency - len(running))
+                if claimed is not None:
+                    idle = not claimed
+            for task_id in claimed or ():
+                running[executor.submit(run_task, task_id)] = task_id
+            if not running:
+                if once and idle:
+                    break
+                time.sleep(settings.TASKS_POLL_INTERVAL)
+                continue
+            # Пока есть свободные слоты, очередь опрашивается
+            # раз в TASKS_POLL_INTERVAL и во время выполнения задач.
+            polling = len(running) < concurrency and not (once and idle)
+            done, _ = wait(
+                running, return_when=FIRST_COMPLETED,
+                timeout=settings.TASKS_POLL_INTERVAL if polling else None)
+            for future in done:
+                self.finish(running.pop(future), future)
+
+    def claim(self, limit):
+        """
+        Забирает до limit задач. При ошибке БД возвращает None.
+        """
+
+        try:
+            return claim(limit)
+        except DatabaseError:
+            logger.exception("Не удалось забрать задачи")
+            connections.close_all()
+            return None
+
+    def finish(self, task_id, future):
+        """
+        Ошибка задачи, вышедшая за run_task (например, задача удалена
+        или недоступна БД), записывается в лог и не останавливает воркер.
+        """
+
+        try:
+            future.result()
+        except Exception:
+            logger.exception("Не удалось выполнить задачу #%s", task_id)
@@ -0,0 +1,46 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    Класс представляет задачу в очереди фоновых задач.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUSES = (
+        (QUEUED, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (FAILED, "Ошибка"),
+    )
+
+    name = models.CharField(verbose_name="Задача", max_length=200)
+    args = models.JSONField(verbose_name="Аргументы", default=list)
+    kwargs = models.JSONField(verbose_name="Именованные аргументы",
+                              default=dict)
+    status = models.CharField(
+        verbose_name="Статус", max_length=16, choices=STATUSES,
+        default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name="Попыток", default=0)
+    max_retries = models.PositiveSmallIntegerField(
+        verbose_name="Максимум повторов", default=3)
+    run_at = models.DateTimeField(
+        verbose_name="Запустить не раньше", default=timezone.now)
+    created = models.DateTimeField(
+        verbose_name="Создана", auto_now_add=True)
+    last_error = models.TextField(verbose_name="Последняя ошибка",
+                                  blank=True)
+
+    class Meta:
+        verbose_name = "Задача"
+        verbose_name_plural = "Задачи"
+        ordering = ("run_at",)
+        indexes = [
+            models.Index(fields=["status", "run_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
@@ -0,0 +1,46 @@
+from django.conf import settings
+
+from .models import Task
+
+registry = {}
+
+
+class TaskFunction:
+    """
+    Зарегистрированная фоновая задача.
+    Вызов напрямую выполняет её в текущем потоке, delay() ставит
+    в очередь, а при TASKS_EAGER сразу выполняет.
+    """
+
+    def __init__(self, func, name, max_retries):
+        self.func = func
+        self.name = name
+        self.max_retries = max_retries
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        if settings.TASKS_EAGER:
+            self.func(*args, **kwargs)
+            return None
+        return Task.objects.create(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            max_retries=self.max_retries,
+        )
+
+
+def task(name=None, max_retries=3):
+    """
+    Декоратор регистрации фоновой задачи.
+    Аргументы задачи должны сериализоваться в JSON.
+    """
+
+    def decorator(func):
+        task_name = name or f"{func.__module__}.{func.__name__}"
+        registry[task_name] = TaskFunction(func, task_name, max_retries)
+        return registry[task_name]
+
+    return decorator
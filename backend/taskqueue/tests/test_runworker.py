@@ -0,0 +1,61 @@
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import SimpleTestCase, override_settings
+
+from taskqueue.models import Task
+
+COMMAND = "taskqueue.management.commands.runworker"
+
+
+@override_settings(TASKS_POLL_INTERVAL=0)
+class RunWorkerTest(SimpleTestCase):
+    def run_worker(self, claimed, run_task):
+        with mock.patch(f"{COMMAND}.claim", side_effect=claimed), \
+                mock.patch(f"{COMMAND}.run_task", side_effect=run_task), \
+                self.assertLogs("taskqueue.worker", "ERROR") as logs:
+            call_command("runworker", "--once", stdout=StringIO())
+        return logs.output
+
+    def test_task_error_does_not_stop_worker(self):
+        done = []
+
+        def run_task(task_id):
+            if task_id == 1:
+                raise Task.DoesNotExist
+            done.append(task_id)
+
+        output = self.run_worker([[1, 2], [3], []], run_task)
+        self.assertCountEqual(done, [2, 3])
+        self.assertEqual(len(output), 1)
+        self.assertIn("#1", output[0])
+
+    def test_claim_error_is_retried(self):
+        done = []
+        output = self.run_worker(
+            [DatabaseError("connection lost"), [5], []], done.append)
+        self.assertEqual(done, [5])
+        self.assertIn("Не удалось забрать задачи", output[0])
+
+    def test_free_slot_is_refilled_while_slow_task_runs(self):
+        started = threading.Event()
+        waited = []
+
+        def run_task(task_id):
+            if task_id == 1:
+                # Дождётся задачи 3, только если её забрали до
+                # завершения задачи 1.
+                waited.append(started.wait(5))
+            elif task_id == 3:
+                started.set()
+
+        with mock.patch(f"{COMMAND}.claim",
+                        side_effect=[[1, 2], [3], []]) as claim, \
+                mock.patch(f"{COMMAND}.run_task", side_effect=run_task):
+            call_command("runworker", "--once", "--concurrency", "2",
+                         stdout=StringIO())
+        self.assertEqual(waited, [True])
+        self.assertEqual(claim.call_args_list[1], mock.call(1))
@@ -0,0 +1,29 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from taskqueue.models import Task
+from taskqueue.worker import LEASE_EXPIRED, claim
+
+
+class ClaimTest(TestCase):
+    def create(self, **fields):
+        return Task.objects.create(
+            name="test", run_at=timezone.now() - datetime.timedelta(1),
+            **fields)
+
+    def test_expired_lease_is_reclaimed(self):
+        task = self.create(status=Task.RUNNING, attempts=1)
+        self.assertEqual(claim(10), [task.pk])
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.RUNNING, 2))
+
+    def test_exhausted_task_is_failed_instead_of_reclaimed(self):
+        task = self.create(status=Task.RUNNING, attempts=4, max_retries=3)
+        queued = self.create()
+        self.assertEqual(claim(10), [queued.pk])
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 4)
+        self.assertEqual(task.last_error, LEASE_EXPIRED)
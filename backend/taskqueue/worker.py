@@ -0,0 +1,80 @@
+import datetime
+import logging
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+from .registry import registry
+
+logger = logging.getLogger(__name__)
+
+LEASE_EXPIRED = "Аренда истекла: воркер не завершил последнюю попытку."
+
+
+def claim(limit):
+    """
+    Забирает до limit готовых к запуску задач.
+    SELECT ... FOR UPDATE SKIP LOCKED не даёт двум воркерам взять одну
+    задачу; задачи зависшего воркера возвращаются по истечении аренды.
+    Задача, исчерпавшая попытки и не вернувшаяся из выполнения
+    (например, уронившая воркер), помечается ошибкой, а не забирается
+    снова.
+    """
+
+    now = timezone.now()
+    lease_until = now + datetime.timedelta(seconds=settings.TASKS_LEASE)
+    with transaction.atomic():
+        exhausted = Task.objects.filter(
+            status=Task.RUNNING,
+            run_at__lte=now,
+            attempts__gt=F("max_retries"),
+        ).update(status=Task.FAILED, last_error=LEASE_EXPIRED)
+        if exhausted:
+            logger.error("Задач с истёкшей арендой помечено ошибкой: %s",
+                         exhausted)
+        task_ids = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Task.QUEUED) | Q(status=Task.RUNNING),
+                run_at__lte=now,
+            )
+            .values_list("id", flat=True)[:limit]
+        )
+        Task.objects.filter(pk__in=task_ids).update(
+            status=Task.RUNNING,
+            attempts=F("attempts") + 1,
+            run_at=lease_until,
+        )
+    return task_ids
+
+
+def run_task(task_id):
+    """
+    Выполняет задачу. Успешная задача удаляется, упавшая
+    откладывается с экспоненциальной задержкой или помечается ошибкой.
+    """
+
+    close_old_connections()
+    try:
+        task = Task.objects.get(pk=task_id)
+        try:
+            registry[task.name](*task.args, **task.kwargs)
+        except Exception:
+            logger.exception("Задача %s #%s упала", task.name, task.pk)
+            task.last_error = traceback.format_exc()
+            if task.attempts > task.max_retries:
+                task.status = Task.FAILED
+            else:
+                task.status = Task.QUEUED
+                task.run_at = timezone.now() + datetime.timedelta(
+                    seconds=settings.TASKS_RETRY_DELAY
+                    * 2 ** (task.attempts - 1))
+            task.save(update_fields=("status", "run_at", "last_error"))
+        else:
+            task.delete()
+    finally:
+        close_old_connections()
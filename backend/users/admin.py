@@ -1,24 +1,34 @@
 from django.conf import settings
 from django.contrib import admin
 
+from foodgram.admin_search import IndexedSearchMixin
+from foodgram.paginator import EstimatedCountPaginator
 from .models import Follow, User
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(IndexedSearchMixin, admin.ModelAdmin):
     """
     Класс модели Users.
     """
 
-    search_fields = ("email", "first_name")
-    list_filter = ("email", "first_name")
+    list_display = ("username", "email", "first_name", "last_name")
+    search_fields = ("^email", "^username")
     empty_value_display = "-пусто-"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(IndexedSearchMixin, admin.ModelAdmin):
     """
     Класс модели Follow.
     """
 
+    list_display = ("user", "author")
+    list_select_related = ("user", "author")
+    raw_id_fields = ("user", "author")
+    search_fields = ("=user__email", "=author__email")
     empty_value_display = settings.ADMIN_SITE_HEADER
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
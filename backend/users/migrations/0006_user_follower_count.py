@@ -0,0 +1,47 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_followers(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    Follow = apps.get_model("users", "Follow")
+    User.objects.update(follower_count=Coalesce(Subquery(
+        Follow.objects.filter(author=OuterRef("pk"))
+        .order_by()
+        .values("author")
+        .annotate(count=Count("pk"))
+        .values("count")
+    ), 0))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0005_user_prefix_indexes"),
+    ]
+
+    # AddField на SQLite пересоздаёт таблицу и не может перенести
+    # индексы по выражениям (user_*_prefix_idx), поэтому столбец
+    # добавляется одним ALTER TABLE, одинаковым для SQLite и PostgreSQL.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'ALTER TABLE "users_user" ADD COLUMN "follower_count" '
+                    'integer DEFAULT 0 NOT NULL '
+                    'CHECK ("follower_count" >= 0)',
+                    'ALTER TABLE "users_user" DROP COLUMN "follower_count"',
+                ),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name="user",
+                    name="follower_count",
+                    field=models.PositiveIntegerField(
+                        default=0, editable=False,
+                        verbose_name="Подписчиков"),
+                ),
+            ],
+        ),
+        migrations.RunPython(count_followers, migrations.RunPython.noop),
+    ]
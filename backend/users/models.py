@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Collate, Lower
 
 
 class User(AbstractUser):
@@ -14,10 +15,26 @@ class User(AbstractUser):
 
     first_name = models.CharField(("first name"), max_length=150, blank=False)
     last_name = models.CharField(("last name"), max_length=150, blank=False)
+    # Ведётся сигналами подписок: лента отбирает по нему авторов,
+    # чьи рецепты не раскладываются по лентам при публикации.
+    follower_count = models.PositiveIntegerField(
+        verbose_name="Подписчиков", default=0, editable=False)
 
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
+        # Поиск по префиксу без учёта регистра: побайтовое сравнение
+        # (COLLATE "C") позволяет использовать индекс для LIKE 'префикс%'.
+        indexes = [
+            models.Index(
+                Collate(Lower("username"), "C"),
+                name="user_username_prefix_idx",
+            ),
+            models.Index(
+                Collate(Lower("email"), "C"),
+                name="user_email_prefix_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.username